@@ -0,0 +1,113 @@
+import logging
+import os
+import threading
+import time
+from collections import deque, namedtuple
+import cv2
+from PyQt6.QtCore import QThread, pyqtSignal
+
+Frame = namedtuple('Frame', ['sequence', 'timestamp', 'image'])
+
+class FrameRingBuffer:
+    def __init__(self, maxlen=10):
+        self.frames = deque(maxlen=maxlen)
+        self.lock = threading.Lock()
+        self.next_sequence = 0
+        self.frames_captured = 0
+        # Per-consumer bookkeeping, keyed by consumer name
+        self.last_sequences = {}
+        self.frames_dropped = {}
+        self.last_lag = {}
+
+    def append(self, image, timestamp=None):
+        with self.lock:
+            frame = Frame(self.next_sequence, timestamp if timestamp is not None else time.monotonic(), image)
+            self.frames.append(frame)
+            self.next_sequence += 1
+            self.frames_captured += 1
+            return frame
+
+    def latest(self, consumer):
+        # Never blocks on the device: returns whatever the capture thread stored last
+        with self.lock:
+            if not self.frames:
+                return None
+            frame = self.frames[-1]
+            last_sequence = self.last_sequences.get(consumer)
+            if last_sequence is not None and frame.sequence > last_sequence + 1:
+                self.frames_dropped[consumer] = self.frames_dropped.get(consumer, 0) + frame.sequence - last_sequence - 1
+            self.last_sequences[consumer] = frame.sequence
+            self.last_lag[consumer] = time.monotonic() - frame.timestamp
+            return frame
+
+    def stats(self):
+        with self.lock:
+            return {
+                'captured': self.frames_captured,
+                'dropped': dict(self.frames_dropped),
+                'lag_ms': {consumer: round(lag * 1000, 1) for consumer, lag in self.last_lag.items()},
+            }
+
+class CameraCapture(QThread):
+    # Emits (camera_id, message)
+    capture_failed = pyqtSignal(str, str)
+
+    MAX_CONSECUTIVE_FAILURES = 50
+
+    def __init__(self, camera_id, source, width, height, buffer_size=10, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.camera_id = camera_id
+        self.source = source
+        self.width = width
+        self.height = height
+        self.buffer = FrameRingBuffer(buffer_size)
+        # Single-use thread: cleared by stop(), possibly before run() starts
+        self.running = True
+        self.read_failures = 0
+
+    def run(self):
+        cap = cv2.VideoCapture(self.source)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if not cap.isOpened():
+            self.capture_failed.emit(self.camera_id, f"Could not open camera {self.source}")
+            return
+
+        # Video files are read as fast as decoding allows, so pace them at their recorded frame rate
+        is_file = isinstance(self.source, str) and os.path.isfile(self.source)
+        frame_interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 25.0) if is_file else 0.0
+
+        consecutive_failures = 0
+        next_frame_time = time.monotonic()
+        try:
+            while self.running:
+                # read() blocks until the device delivers the next frame, pacing the loop at the native rate
+                ret, image = cap.read()
+                if not ret:
+                    if is_file:
+                        self.capture_failed.emit(self.camera_id, f"Video {self.source} has ended")
+                        break
+                    self.read_failures += 1
+                    consecutive_failures += 1
+                    if consecutive_failures >= self.MAX_CONSECUTIVE_FAILURES:
+                        self.capture_failed.emit(self.camera_id, f"Camera {self.source} stopped delivering frames")
+                        break
+                    time.sleep(0.01)
+                    continue
+                consecutive_failures = 0
+                if frame_interval:
+                    next_frame_time += frame_interval
+                    time.sleep(max(0.0, next_frame_time - time.monotonic()))
+                self.buffer.append(image, time.monotonic())
+        finally:
+            cap.release()
+
+    def stop(self):
+        self.running = False
+        self.wait()
+
+    def stats(self):
+        stats = self.buffer.stats()
+        stats['read_failures'] = self.read_failures
+        return stats
@@ -2,7 +2,7 @@
 
 import json
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 def load_config() -> Dict[str, Any]:
     # Get the directory of the current file (config.py)
@@ -28,4 +28,22 @@ def load_config() -> Dict[str, Any]:
     except FileNotFoundError:
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
     except json.JSONDecodeError:
-        raise ValueError(f"Invalid JSON in configuration file: {config_path}")
\ No newline at end of file
+        raise ValueError(f"Invalid JSON in configuration file: {config_path}")
+
+def get_camera_configs(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # 'cameras' lists every lane; a lone legacy 'camera' section is treated as a single camera
+    cameras = config.get('cameras')
+    if not cameras:
+        cameras = [dict(config['camera'], id='camera', name='Camera')]
+
+    camera_configs = []
+    for i, camera in enumerate(cameras):
+        camera = dict(camera)
+        camera.setdefault('id', f"camera{i + 1}")
+        camera.setdefault('name', camera['id'])
+        # A source is a USB index, an RTSP/HTTP URL or a video file path
+        camera.setdefault('source', camera.get('index', 0))
+        camera.setdefault('width', 1280)
+        camera.setdefault('height', 720)
+        camera_configs.append(camera)
+    return camera_configs
@@ -1,21 +1,62 @@
 import sqlite3
+from contextlib import contextmanager
 from datetime import datetime
 import os
 import json
+import queue
+import threading
+from schema_migrations import (SchemaMigrator, EPOCH_TIMESTAMPS_VERSION, VEHICLE_SEARCH_VERSION, VEHICLE_SEARCH_COLUMNS,
+                               epoch_ms_sql)
+from plate_text import plate_search_key, plate_search_key_sql
+from plate_index import PlateIndex
+from timestamps import now_ms, to_epoch_ms
+from write_queue import WriteQueue
+
+# Sortable entry_exit columns: (index in a log row, value that stands in for NULL when paging)
+ENTRY_EXIT_SORT_COLUMNS = {
+    'vehicle_number': (1, None),
+    'in_time': (2, None),
+    'out_time': (3, -1),
+    'duration_ms': (6, -1),
+}
 
 class DatabaseManager:
+    # A single instance is shared by the whole application. Writes are serialized through one
+    # connection under a lock; reads borrow one of a few reader connections, so pages and worker
+    # threads can query concurrently without opening connections of their own.
+
     def __init__(self, config_path='../config.json'):
         self.config = self.load_config(config_path)
         self.db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), self.config['database']['file']))
-        self.conn = None
-        self.cursor = None
+        self.reader_count = max(1, self.config['database'].get('reader_connections', 3))
+        self.write_lock = threading.RLock()
+        # COUNT results keyed by filter; bumping the generation invalidates all of them
+        self.count_cache = {}
+        self.count_generation = 0
+        self.search_uses_fts = None
+        # Nearest-plate lookup over vehicle numbers; None until build_plate_index() has finished, then
+        # updated by vehicle writes. While it is being built, those updates are recorded for replay.
+        self.plate_index = None
+        self.plate_index_updates = None
+        self.plate_index_lock = threading.Lock()
+        self.writer = None
+        self.readers = queue.Queue()
+        self.reader_connections = []
         self.connect()
-        self.create_tables()
+        self.migrator = SchemaMigrator(self, batch_size=self.config['database'].get('backfill_batch_size', 1000))
+        self.migrate()
+        self.write_queue = WriteQueue(
+            self,
+            max_batch_size=self.config['database'].get('write_batch_size', 64),
+            batch_interval=self.config['database'].get('write_batch_interval_seconds', 0.05)
+        )
+        self.write_queue.start()
     
     def get_all_vehicles(self):
         try:
-            self.cursor.execute("SELECT * FROM vehicles")
-            return self.cursor.fetchall()
+            with self.reading() as cursor:
+                cursor.execute("SELECT * FROM vehicles")
+                return cursor.fetchall()
         except sqlite3.Error as e:
             print(f"Error retrieving all vehicles: {e}")
             return []
@@ -26,179 +67,550 @@ class DatabaseManager:
 
     def connect(self):
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.cursor = self.conn.cursor()
-            print(f"Connected to database: {self.db_path}")
+            self.writer = self.open_connection()
+            # WAL lets the readers run while the writer commits; the mode is stored in the database file
+            journal_mode = self.config['database'].get('journal_mode', 'WAL')
+            self.writer.execute(f"PRAGMA journal_mode={journal_mode}")
+            for _ in range(self.reader_count):
+                connection = self.open_connection()
+                self.reader_connections.append(connection)
+                self.readers.put(connection)
+            print(f"Connected to database: {self.db_path} (1 writer, {self.reader_count} readers)")
         except sqlite3.Error as e:
             print(f"Error connecting to database: {e}")
 
-    def create_tables(self):
-        try:
-            # Check if tables exist before creating them
-            self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND (name='vehicles' OR name='entry_exit')")
-            existing_tables = self.cursor.fetchall()
-            existing_table_names = [table[0] for table in existing_tables]
-
-            tables_created = []
-
-            if 'vehicles' not in existing_table_names:
-                self.cursor.execute('''
-                    CREATE TABLE vehicles (
-                        vehicle_number TEXT PRIMARY KEY,
-                        vehicle_type TEXT,
-                        vehicle_color TEXT,
-                        owner_name TEXT,
-                        owner_aadhar TEXT,
-                        affiliation TEXT,
-                        image_path TEXT
-                    )
-                ''')
-                tables_created.append('vehicles')
-
-            if 'entry_exit' not in existing_table_names:
-                self.cursor.execute('''
-                    CREATE TABLE entry_exit (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        vehicle_number TEXT,
-                        in_time TIMESTAMP,
-                        out_time TIMESTAMP,
-                        FOREIGN KEY (vehicle_number) REFERENCES vehicles (vehicle_number)
-                    )
-                ''')
-                tables_created.append('entry_exit')
+    def open_connection(self):
+        # Connections are handed between threads, but each is only used by one thread at a time
+        connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        database_config = self.config['database']
+        # NORMAL only syncs at checkpoints in WAL mode; a power cut can lose the last commits but not corrupt
+        connection.execute(f"PRAGMA synchronous={database_config.get('synchronous', 'NORMAL')}")
+        # A negative cache_size is in KiB
+        connection.execute(f"PRAGMA cache_size={-int(database_config.get('cache_size_kb', 16384))}")
+        connection.execute(f"PRAGMA mmap_size={int(database_config.get('mmap_size_mb', 256)) * 1024 * 1024}")
+        return connection
 
-            self.conn.commit()
+    @contextmanager
+    def reading(self):
+        connection = self.readers.get()
+        try:
+            yield connection.cursor()
+        finally:
+            self.readers.put(connection)
 
-            if tables_created:
-                print(f"Tables created: {', '.join(tables_created)}")
-            else:
-                print("All required tables already exist")
+    @contextmanager
+    def writing(self):
+        # Commits when the block completes and rolls back if it raises
+        with self.write_lock:
+            cursor = self.writer.cursor()
+            try:
+                yield cursor
+                self.writer.commit()
+            except BaseException:
+                self.writer.rollback()
+                raise
 
+    def migrate(self):
+        # Fatal: queries rely on the migrated schema (log_entry_exit names one of its indexes), so
+        # running on a half-migrated database would fail every gate event instead
+        try:
+            self.migrator.migrate()
         except sqlite3.Error as e:
-            print(f"Error handling tables: {e}")
+            print(f"Error migrating database schema: {e}")
+            for connection in [self.writer] + self.reader_connections:
+                if connection is not None:
+                    connection.close()
+            raise
+        # Data backfills run after startup, in batches
+        self.migrator.start_backfills()
+
+    def submit_write(self, operation, action, wait=True, changes_entry_exit=False, on_commit=None):
+        # With wait=False the caller gets the Future and does not block on the commit. on_commit is
+        # called with the operation's result once it has been committed.
+        future = self.write_queue.submit(operation)
+        future.add_done_callback(lambda done: self.report_write_error(done, action))
+        if changes_entry_exit:
+            # Only after the commit, so a count taken in between cannot be cached as current
+            future.add_done_callback(lambda done: self.invalidate_counts())
+        if not wait:
+            if on_commit is not None:
+                future.add_done_callback(lambda done: self.run_commit_hook(done, on_commit))
+            return future
+        try:
+            result = future.result()
+        except sqlite3.Error:
+            return False
+        finally:
+            # Callbacks may still be running when result() returns
+            if changes_entry_exit:
+                self.invalidate_counts()
+        if on_commit is not None:
+            on_commit(result)
+        return result
+
+    def run_commit_hook(self, future, on_commit):
+        if not future.cancelled() and future.exception() is None:
+            on_commit(future.result())
+
+    def report_write_error(self, future, action):
+        error = future.exception()
+        if error is not None:
+            print(f"Error {action}: {error}")
 
     def get_vehicle(self, vehicle_number):
         try:
-            self.cursor.execute("SELECT * FROM vehicles WHERE vehicle_number = ?", (vehicle_number,))
-            return self.cursor.fetchone()
+            with self.reading() as cursor:
+                cursor.execute("SELECT * FROM vehicles WHERE vehicle_number = ?", (vehicle_number,))
+                return cursor.fetchone()
         except sqlite3.Error as e:
             print(f"Error retrieving vehicle: {e}")
             return None
 
-    def add_vehicle(self, vehicle_number, vehicle_type, vehicle_color, owner_name, owner_aadhar, affiliation, image_path):
-        try:
-            self.cursor.execute('''
-                INSERT OR REPLACE INTO vehicles 
+    def add_vehicle(self, vehicle_number, vehicle_type, vehicle_color, owner_name, owner_aadhar, affiliation, image_path, wait=True):
+        def write(cursor):
+            # An upsert rather than INSERT OR REPLACE: REPLACE deletes without firing delete triggers
+            # and gives the vehicle a new rowid, which would orphan its search index row. Updating
+            # without a photo (None or "") keeps the one already stored, such as the gate frame
+            # attached to a vehicle registered from a detection.
+            cursor.execute('''
+                INSERT INTO vehicles 
                 (vehicle_number, vehicle_type, vehicle_color, owner_name, owner_aadhar, affiliation, image_path) 
                 VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (vehicle_number) DO UPDATE SET
+                    vehicle_type = excluded.vehicle_type, vehicle_color = excluded.vehicle_color,
+                    owner_name = excluded.owner_name, owner_aadhar = excluded.owner_aadhar,
+                    affiliation = excluded.affiliation,
+                    image_path = COALESCE(NULLIF(excluded.image_path, ''), vehicles.image_path)
             ''', (vehicle_number, vehicle_type, vehicle_color, owner_name, owner_aadhar, affiliation, image_path))
-            self.conn.commit()
             print(f"Vehicle {vehicle_number} added/updated successfully")
             return True
-        except sqlite3.Error as e:
-            print(f"Error adding/updating vehicle: {e}")
-            return False
+        return self.submit_write(
+            write, "adding/updating vehicle", wait, on_commit=lambda added: self.update_plate_index(vehicle_number, True)
+        )
 
-    def edit_vehicle(self, vehicle_number, vehicle_type, vehicle_color, owner_name, owner_aadhar, affiliation, image_path):
-        try:
-            self.cursor.execute('''
+    def edit_vehicle(self, vehicle_number, vehicle_type, vehicle_color, owner_name, owner_aadhar, affiliation, image_path, wait=True):
+        def write(cursor):
+            cursor.execute('''
                 UPDATE vehicles 
                 SET vehicle_type = ?, vehicle_color = ?, owner_name = ?, 
                     owner_aadhar = ?, affiliation = ?, image_path = ?
                 WHERE vehicle_number = ?
             ''', (vehicle_type, vehicle_color, owner_name, owner_aadhar, affiliation, image_path, vehicle_number))
-            self.conn.commit()
-            if self.cursor.rowcount > 0:
+            if cursor.rowcount > 0:
                 print(f"Vehicle {vehicle_number} updated successfully")
                 return True
             else:
                 print(f"Vehicle {vehicle_number} not found")
                 return False
-        except sqlite3.Error as e:
-            print(f"Error updating vehicle: {e}")
-            return False
+        return self.submit_write(write, "updating vehicle", wait)
 
-    def delete_vehicle(self, vehicle_number):
-        try:
+    def delete_vehicle(self, vehicle_number, wait=True):
+        def write(cursor):
             # First, delete related entry_exit records
-            self.cursor.execute("DELETE FROM entry_exit WHERE vehicle_number = ?", (vehicle_number,))
+            cursor.execute("DELETE FROM entry_exit WHERE vehicle_number = ?", (vehicle_number,))
             
             # Then delete the vehicle
-            self.cursor.execute("DELETE FROM vehicles WHERE vehicle_number = ?", (vehicle_number,))
+            cursor.execute("DELETE FROM vehicles WHERE vehicle_number = ?", (vehicle_number,))
             
-            self.conn.commit()
-            if self.cursor.rowcount > 0:
+            if cursor.rowcount > 0:
                 print(f"Vehicle {vehicle_number} and its records deleted successfully")
                 return True
             else:
                 print(f"Vehicle {vehicle_number} not found")
                 return False
-        except sqlite3.Error as e:
-            print(f"Error deleting vehicle: {e}")
-            return False
+        return self.submit_write(
+            write, "deleting vehicle", wait, changes_entry_exit=True,
+            on_commit=lambda deleted: self.update_plate_index(vehicle_number, False)
+        )
 
-    def log_entry_exit(self, vehicle_number):
-        try:
-            current_time = datetime.now()
-            
-            # Check if there's an open entry (no exit time)
-            self.cursor.execute("""
-                SELECT id FROM entry_exit 
+    def log_entry_exit(self, vehicle_number, image_path=None, wait=True):
+        # Stamped when the event happens, not when its batch is committed. Returns (row id, image
+        # column) for the entry or exit that was logged, so its image can be attached afterwards.
+        current_time = now_ms()
+        in_time = self.timestamp_sql('in_time')
+
+        def write(cursor):
+            # Queued writes run one at a time, so the lookup sees every earlier event for this plate.
+            # Check if there's an open entry (no exit time); without statistics the planner may
+            # prefer the full per-vehicle index, which grows with every visit
+            cursor.execute("""
+                SELECT id FROM entry_exit INDEXED BY idx_entry_exit_open
                 WHERE vehicle_number = ? AND out_time IS NULL 
                 ORDER BY in_time DESC LIMIT 1
             """, (vehicle_number,))
-            open_entry = self.cursor.fetchone()
+            open_entry = cursor.fetchone()
 
             if open_entry:
                 # Vehicle is exiting
-                self.cursor.execute("""
-                    UPDATE entry_exit SET out_time = ? WHERE id = ?
-                """, (current_time, open_entry[0]))
+                cursor.execute(f"""
+                    UPDATE entry_exit SET out_time = ?, duration_ms = ? - {in_time}, exit_image_path = ? WHERE id = ?
+                """, (current_time, current_time, image_path, open_entry[0]))
                 print(f"Exit logged for vehicle {vehicle_number}")
+                return open_entry[0], 'exit_image_path'
             else:
                 # Vehicle is entering
-                self.cursor.execute("""
-                    INSERT INTO entry_exit (vehicle_number, in_time) VALUES (?, ?)
-                """, (vehicle_number, current_time))
+                cursor.execute("""
+                    INSERT INTO entry_exit (vehicle_number, in_time, entry_image_path) VALUES (?, ?, ?)
+                """, (vehicle_number, current_time, image_path))
                 print(f"Entry logged for vehicle {vehicle_number}")
+                return cursor.lastrowid, 'entry_image_path'
+        return self.submit_write(write, "logging entry/exit", wait, changes_entry_exit=True)
 
-            self.conn.commit()
-            return True
-        except sqlite3.Error as e:
-            print(f"Error logging entry/exit: {e}")
-            return False
+    def attach_evidence(self, logged, stored, vehicle_number=None):
+        # Records the frame path on a logged entry/exit once both the log_entry_exit Future (logged)
+        # and the EvidenceWriter Future (stored) have resolved; with vehicle_number, also on that
+        # vehicle if it has no photo yet (NULL or ""). Runs on whichever thread finishes last.
+        def attach(_):
+            if logged.cancelled() or logged.exception() is not None or not logged.result():
+                return
+            entry_id, column = logged.result()
+            image_path = stored.result()[0]
+            if image_path is None:
+                return
 
-    def get_entry_exit_logs(self, vehicle_number=None, start_date=None, end_date=None):
+            def write(cursor):
+                cursor.execute(f"UPDATE entry_exit SET {column} = ? WHERE id = ?", (image_path, entry_id))
+                if vehicle_number:
+                    cursor.execute(
+                        "UPDATE vehicles SET image_path = ? WHERE vehicle_number = ? AND COALESCE(image_path, '') = ''",
+                        (image_path, vehicle_number)
+                    )
+                return True
+            self.submit_write(write, "recording evidence image", wait=False)
+
+        stored.add_done_callback(lambda _: logged.add_done_callback(attach))
+
+    def timestamp_sql(self, column):
+        # Until the conversion backfill has finished, older rows may still hold datetime strings
+        if self.migrator.is_applied(EPOCH_TIMESTAMPS_VERSION):
+            return column
+        return epoch_ms_sql(column)
+
+    def entry_exit_query(self, vehicle_number=None, start_date=None, end_date=None):
+        # Returns (select, conditions, params) shared by the log, page and count queries. Rows are
+        # (id, vehicle_number, in_time, out_time, entry_image_path, exit_image_path, duration_ms)
+        # with times in epoch milliseconds; start_date and end_date take the same or a datetime
+        in_time = self.timestamp_sql('in_time')
+        out_time = self.timestamp_sql('out_time')
+        select = f"""
+            SELECT id, vehicle_number, {in_time}, {out_time}, entry_image_path, exit_image_path,
+                   COALESCE(duration_ms, {out_time} - {in_time})
+            FROM entry_exit
+        """
+        params = []
+        conditions = []
+
+        if vehicle_number:
+            conditions.append("vehicle_number = ?")
+            params.append(vehicle_number)
+        if start_date is not None:
+            conditions.append(f"{in_time} >= ?")
+            params.append(to_epoch_ms(start_date))
+        if end_date is not None:
+            conditions.append(f"{in_time} <= ?")
+            params.append(to_epoch_ms(end_date))
+        return select, conditions, params
+
+    def entry_exit_sort_sql(self, sort_column):
+        if sort_column not in ENTRY_EXIT_SORT_COLUMNS:
+            raise ValueError(f"Cannot sort entry/exit logs by {sort_column}")
+        null_value = ENTRY_EXIT_SORT_COLUMNS[sort_column][1]
+        if self.migrator.is_applied(EPOCH_TIMESTAMPS_VERSION):
+            # Exactly the expressions the sort indexes are built on; every completed visit has a
+            # duration_ms by now, so it needs no fallback to out_time - in_time
+            expression = sort_column
+        elif sort_column == 'duration_ms':
+            expression = f"COALESCE(duration_ms, {self.timestamp_sql('out_time')} - {self.timestamp_sql('in_time')})"
+        else:
+            expression = self.timestamp_sql(sort_column) if sort_column in ('in_time', 'out_time') else sort_column
+        return f"COALESCE({expression}, {null_value})" if null_value is not None else expression
+
+    def iter_entry_exit_logs(self, vehicle_number=None, start_date=None, end_date=None, chunk_size=1000):
+        # Yields lists of up to chunk_size rows straight from the cursor. The reader connection is held
+        # until the generator is exhausted or closed, so callers that stop early must close() it.
+        query, conditions, params = self.entry_exit_query(vehicle_number, start_date, end_date)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {self.timestamp_sql('in_time')} DESC"
+        with self.reading() as cursor:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+    def get_entry_exit_page(self, vehicle_number=None, start_date=None, end_date=None,
+                            sort_column='in_time', descending=True, after=None, limit=20):
+        # Keyset pagination: after is the entry_exit_page_key() of the last row of the previous page,
+        # so every page is an index seek however deep into the log it is
         try:
-            query = "SELECT * FROM entry_exit"
-            params = []
-            conditions = []
-
-            if vehicle_number:
-                conditions.append("vehicle_number = ?")
-                params.append(vehicle_number)
-            if start_date:
-                conditions.append("in_time >= ?")
-                params.append(start_date)
-            if end_date:
-                conditions.append("in_time <= ?")
-                params.append(end_date)
+            query, conditions, params = self.entry_exit_query(vehicle_number, start_date, end_date)
+            sort_sql = self.entry_exit_sort_sql(sort_column)
+            direction = "DESC" if descending else "ASC"
+            operator = '<' if descending else '>'
 
+            def read_page(cursor, extra_conditions, extra_params, page_limit, order_sql=f"{sort_sql} {direction}, "):
+                page_conditions = conditions + extra_conditions
+                page_query = query
+                if page_conditions:
+                    page_query += " WHERE " + " AND ".join(page_conditions)
+                page_query += f" ORDER BY {order_sql}id {direction} LIMIT ?"
+                cursor.execute(page_query, params + extra_params + [page_limit])
+                return cursor.fetchall()
+
+            with self.reading() as cursor:
+                if after is None:
+                    return read_page(cursor, [], [], limit)
+                # SQLite only seeks on the first term of a row-value comparison, so a large run of
+                # equal sort values (every open visit sorts as -1) would be filtered row by row.
+                # Instead: the rest of the run after the previous page, ordered by id alone as the
+                # sort value is fixed (otherwise the planner sorts it again), then the rows past it.
+                rows = read_page(cursor, [f"{sort_sql} = ?", f"id {operator} ?"], list(after), limit, order_sql="")
+                if len(rows) < limit:
+                    rows += read_page(cursor, [f"{sort_sql} {operator} ?"], [after[0]], limit - len(rows))
+                return rows
+        except sqlite3.Error as e:
+            print(f"Error retrieving entry/exit page: {e}")
+            return []
+
+    @staticmethod
+    def entry_exit_page_key(row, sort_column='in_time'):
+        index, null_value = ENTRY_EXIT_SORT_COLUMNS[sort_column]
+        value = row[index]
+        return (null_value if value is None else value, row[0])
+
+    def count_entry_exit_logs(self, vehicle_number=None, start_date=None, end_date=None):
+        key = (vehicle_number or None,
+               None if start_date is None else to_epoch_ms(start_date),
+               None if end_date is None else to_epoch_ms(end_date))
+        # Read the generation first: a write committed while counting makes this result stale
+        generation = self.count_generation
+        cached = self.count_cache.get(key)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        try:
+            _, conditions, params = self.entry_exit_query(vehicle_number, start_date, end_date)
+            query = "SELECT COUNT(*) FROM entry_exit"
             if conditions:
                 query += " WHERE " + " AND ".join(conditions)
+            with self.reading() as cursor:
+                cursor.execute(query, params)
+                count = cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error counting entry/exit logs: {e}")
+            return 0
+        self.count_cache[key] = (generation, count)
+        return count
 
-            query += " ORDER BY in_time DESC"
+    def invalidate_counts(self):
+        self.count_generation += 1
+        self.count_cache = {}
 
-            self.cursor.execute(query, params)
-            return self.cursor.fetchall()
+    def count_vehicles(self):
+        try:
+            with self.reading() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM vehicles")
+                return cursor.fetchone()[0]
         except sqlite3.Error as e:
-            print(f"Error retrieving entry/exit logs: {e}")
+            print(f"Error counting vehicles: {e}")
+            return 0
+
+    def iter_vehicles(self, chunk_size=1000):
+        # Same contract as iter_entry_exit_logs
+        with self.reading() as cursor:
+            cursor.execute("SELECT * FROM vehicles ORDER BY vehicle_number")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+    def get_vehicles_page(self, after=None, limit=100):
+        # Vehicles with thumbnails ordered by vehicle number; after is the last vehicle number of the
+        # previous page
+        try:
+            query = '''
+                SELECT v.*, i.thumbnail_path FROM vehicles v
+                LEFT JOIN images i ON i.path = v.image_path
+            '''
+            params = []
+            if after is not None:
+                query += " WHERE v.vehicle_number > ?"
+                params.append(after)
+            query += " ORDER BY v.vehicle_number LIMIT ?"
+            params.append(limit)
+            with self.reading() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error retrieving vehicles page: {e}")
+            return []
+
+    def search_vehicles(self, term, limit=200):
+        # Ranked vehicle rows (with thumbnail_path, like get_vehicles_page) matching term in any
+        # field, where plate numbers also match across OCR-confusable characters. Exact plate
+        # matches come first, then plates starting with the term, then FTS relevance. Terms of
+        # one or two characters only match the start of plate numbers.
+        term = (term or '').strip()
+        key = plate_search_key(term)
+        if not term:
             return []
+        try:
+            with self.reading() as cursor:
+                use_index = self.migrator.is_applied(VEHICLE_SEARCH_VERSION) and self.vehicle_search_is_fts(cursor)
+                if use_index and len(term) >= 3 and (not key or len(key) >= 3):
+                    quoted_term = term.replace('"', '""')
+                    match = f'"{quoted_term}"'
+                    if key:
+                        match = f'plate_key : "{key}" OR {match}'
+                    cursor.execute('''
+                        SELECT v.*, i.thumbnail_path FROM vehicle_search s
+                        JOIN vehicles v ON v.rowid = s.rowid
+                        LEFT JOIN images i ON i.path = v.image_path
+                        WHERE vehicle_search MATCH ?
+                        ORDER BY s.plate_key = ? DESC, s.plate_key LIKE ? || '%' DESC, s.rank
+                        LIMIT ?
+                    ''', (match, key, key, limit))
+                elif use_index:
+                    # Shorter than a trigram: plates starting with the term, through the primary key
+                    prefix = term.upper()
+                    cursor.execute('''
+                        SELECT v.*, i.thumbnail_path FROM vehicles v
+                        LEFT JOIN images i ON i.path = v.image_path
+                        WHERE v.vehicle_number >= ? AND v.vehicle_number < ?
+                        ORDER BY v.vehicle_number
+                        LIMIT ?
+                    ''', (prefix, prefix + '\uffff', limit))
+                else:
+                    # The index is still being built, or SQLite has no FTS5: scan every vehicle
+                    plate_key = plate_search_key_sql('v.vehicle_number')
+                    fields = " OR ".join(f"v.{column} LIKE ?" for column in VEHICLE_SEARCH_COLUMNS)
+                    pattern = f"%{term}%"
+                    cursor.execute(f'''
+                        SELECT v.*, i.thumbnail_path FROM vehicles v
+                        LEFT JOIN images i ON i.path = v.image_path
+                        WHERE ({plate_key} LIKE ? AND ? != '') OR {fields}
+                        ORDER BY {plate_key} = ? DESC, {plate_key} LIKE ? || '%' DESC, v.vehicle_number
+                        LIMIT ?
+                    ''', [f"%{key}%", key] + [pattern] * len(VEHICLE_SEARCH_COLUMNS) + [key, key, limit])
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error searching vehicles: {e}")
+            return []
+
+    def vehicle_search_is_fts(self, cursor):
+        if self.search_uses_fts is None:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'vehicle_search'")
+            row = cursor.fetchone()
+            self.search_uses_fts = bool(row and 'fts5' in row[0].lower())
+        return self.search_uses_fts
+
+    def build_plate_index(self):
+        # Reads the registry and builds the index without holding the lock, so neither queued writes
+        # nor the GUI wait on it; vehicle writes committed meanwhile are replayed, in commit order,
+        # before the index is swapped in. Replaying a write the scan already saw is harmless.
+        with self.plate_index_lock:
+            if self.plate_index is not None or self.plate_index_updates is not None:
+                return
+            self.plate_index_updates = []
+        index = None
+        try:
+            with self.reading() as cursor:
+                cursor.execute("SELECT vehicle_number FROM vehicles")
+                index = PlateIndex(row[0] for row in cursor)
+        except sqlite3.Error as e:
+            print(f"Error building plate index: {e}")
+        with self.plate_index_lock:
+            if index is not None:
+                for vehicle_number, registered in self.plate_index_updates:
+                    self.apply_plate_index_update(index, vehicle_number, registered)
+            self.plate_index = index
+            self.plate_index_updates = None
+
+    def get_plate_index(self):
+        # Never blocks: None until build_plate_index() has finished
+        return self.plate_index
+
+    def update_plate_index(self, vehicle_number, registered):
+        # Runs after the write commits
+        with self.plate_index_lock:
+            if self.plate_index_updates is not None:
+                self.plate_index_updates.append((vehicle_number, registered))
+            elif self.plate_index is not None:
+                self.apply_plate_index_update(self.plate_index, vehicle_number, registered)
+
+    @staticmethod
+    def apply_plate_index_update(index, vehicle_number, registered):
+        if registered:
+            index.add(vehicle_number)
+        else:
+            index.remove(vehicle_number)
+
+    def record_image(self, path, content_hash, kind, source_path, thumbnail_path, width, height, size_bytes, wait=True):
+        created_at = datetime.now()
+
+        def write(cursor):
+            cursor.execute('''
+                INSERT OR REPLACE INTO images
+                (path, content_hash, kind, source_path, thumbnail_path, width, height, size_bytes, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (path, content_hash, kind, source_path, thumbnail_path, width, height, size_bytes, created_at))
+            return True
+        return self.submit_write(write, "recording image", wait)
+
+    def get_image_paths(self):
+        try:
+            with self.reading() as cursor:
+                cursor.execute("SELECT path FROM images")
+                return {row[0] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            print(f"Error retrieving image paths: {e}")
+            return set()
+
+    def get_unreferenced_images(self, created_before):
+        # Plate crops live and die with the frame they were cut from
+        try:
+            with self.reading() as cursor:
+                cursor.execute('''
+                    SELECT path FROM images
+                    WHERE created_at < ?
+                      AND COALESCE(source_path, path) NOT IN (SELECT image_path FROM vehicles WHERE image_path IS NOT NULL)
+                      AND COALESCE(source_path, path) NOT IN (SELECT entry_image_path FROM entry_exit WHERE entry_image_path IS NOT NULL)
+                      AND COALESCE(source_path, path) NOT IN (SELECT exit_image_path FROM entry_exit WHERE exit_image_path IS NOT NULL)
+                ''', (datetime.fromtimestamp(created_before),))
+                return [row[0] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"Error retrieving unreferenced images: {e}")
+            return []
+
+    def delete_image_records(self, paths, wait=True):
+        def write(cursor):
+            cursor.executemany("DELETE FROM images WHERE path = ?", [(path,) for path in paths])
+            return True
+        return self.submit_write(write, "deleting image records", wait)
 
     def close(self):
-        if self.conn:
-            self.conn.close()
-            print("Database connection closed")
+        # Waits for the write in progress and for readers that are checked out
+        self.migrator.stop()
+        self.write_queue.close()
+        with self.write_lock:
+            if self.writer is None:
+                return
+            try:
+                # With synchronous=NORMAL the last commits are only in the WAL; the checkpoint
+                # moves them into the database file and syncs it
+                self.writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                # Refreshes planner statistics for tables whose shape changed during the session
+                self.writer.execute("PRAGMA optimize")
+            except sqlite3.Error as e:
+                print(f"Error flushing database: {e}")
+            self.writer.close()
+            self.writer = None
+        for _ in self.reader_connections:
+            self.readers.get().close()
+        self.reader_connections = []
+        print("Database connection closed")
 
 def get_database_manager(config_path='../config.json'):
-    return DatabaseManager(config_path)
\ No newline at end of file
+    return DatabaseManager(config_path)
@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+
+class DetectionRegion:
+    def __init__(self, roi=None, detection_width=None):
+        # roi is a polygon [[x, y], ...] in full-resolution pixel coordinates
+        self.polygon = np.array(roi, dtype=np.int32) if roi else None
+        self.bounds = cv2.boundingRect(self.polygon) if roi else None
+        self.detection_width = detection_width
+        # Reused between frames; the capture resolution of a camera does not change
+        self.resize_buffer = None
+
+    def prepare(self, image):
+        # Returns the image to run detection on and the (offset_x, offset_y, scale) to map boxes back
+        offset_x, offset_y = 0, 0
+        if self.bounds:
+            x, y, w, h = self.bounds
+            image = image[y:y + h, x:x + w]
+            offset_x, offset_y = x, y
+
+        scale = 1.0
+        h, w = image.shape[:2]
+        if self.detection_width and w > self.detection_width:
+            scale = self.detection_width / float(w)
+            size = (self.detection_width, int(round(h * scale)))
+            if self.resize_buffer is None or self.resize_buffer.shape[:2] != (size[1], size[0]):
+                self.resize_buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            image = cv2.resize(image, size, dst=self.resize_buffer, interpolation=cv2.INTER_AREA)
+        return image, (offset_x, offset_y, scale)
+
+    def to_full_resolution(self, detections, transform, frame_shape):
+        offset_x, offset_y, scale = transform
+        frame_h, frame_w = frame_shape[:2]
+        mapped = []
+        for x1, y1, x2, y2, score in detections:
+            x1 = min(frame_w, max(0, int(x1 / scale) + offset_x))
+            y1 = min(frame_h, max(0, int(y1 / scale) + offset_y))
+            x2 = min(frame_w, max(0, int(x2 / scale) + offset_x))
+            y2 = min(frame_h, max(0, int(y2 / scale) + offset_y))
+            # The bounding rectangle of the lane polygon can include pixels outside the lane
+            if self.polygon is not None and cv2.pointPolygonTest(self.polygon, ((x1 + x2) / 2, (y1 + y2) / 2), False) < 0:
+                continue
+            mapped.append((x1, y1, x2, y2, score))
+        return mapped
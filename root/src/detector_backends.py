@@ -0,0 +1,181 @@
+import logging
+import os
+import shutil
+from collections import namedtuple
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Letterbox = namedtuple('Letterbox', ['scale', 'new_w', 'new_h', 'pad_x', 'pad_y', 'resized', 'canvas'])
+
+class UltralyticsDetector:
+    def __init__(self, model_path, input_size=640, conf=0.25, iou=0.45, threads=None):
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.input_size = input_size
+        self.conf = conf
+        self.iou = iou
+
+    def detect_batch(self, images):
+        # Ultralytics runs a list of images as a single batch; each result is a list of
+        # (x1, y1, x2, y2, score) in image coordinates
+        results = self.model(images, imgsz=self.input_size, conf=self.conf, iou=self.iou, verbose=False)
+        batch_detections = []
+        for result in results:
+            detections = []
+            for (x1, y1, x2, y2), score in zip(result.boxes.xyxy.tolist(), result.boxes.conf.tolist()):
+                detections.append((int(x1), int(y1), int(x2), int(y2), float(score)))
+            batch_detections.append(detections)
+        return batch_detections
+
+class ExportedYoloDetector:
+    # Shared letterbox pre-processing and YOLOv8 output decoding for exported models with a fixed input size
+
+    def __init__(self, input_size=640, conf=0.25, iou=0.45):
+        self.input_size = input_size
+        self.conf = conf
+        self.iou = iou
+        # Input buffers are allocated once and reused for every frame
+        self.rgb = np.empty((input_size, input_size, 3), dtype=np.uint8)
+        self.blob = np.empty((1, 3, input_size, input_size), dtype=np.float32)
+        # (h, w) -> Letterbox; cameras sharing the detector may each send a differently shaped region
+        self.letterboxes = {}
+
+    def infer(self, blob):
+        raise NotImplementedError
+
+    def detect_batch(self, images):
+        # Exported models have a fixed batch size of one
+        return [self.detect(image) for image in images]
+
+    def preprocess(self, image):
+        # Letterbox geometry only changes with the input shape, which is fixed per camera; each
+        # shape keeps its own resize buffer and padded canvas
+        h, w = image.shape[:2]
+        letterbox = self.letterboxes.get((h, w))
+        if letterbox is None:
+            scale = min(self.input_size / h, self.input_size / w)
+            new_w, new_h = int(round(w * scale)), int(round(h * scale))
+            letterbox = Letterbox(
+                scale, new_w, new_h, (self.input_size - new_w) // 2, (self.input_size - new_h) // 2,
+                np.empty((new_h, new_w, 3), dtype=np.uint8),
+                np.full((self.input_size, self.input_size, 3), 114, dtype=np.uint8)
+            )
+            self.letterboxes[(h, w)] = letterbox
+
+        scale, new_w, new_h, pad_x, pad_y, resized, canvas = letterbox
+        cv2.resize(image, (new_w, new_h), dst=resized, interpolation=cv2.INTER_LINEAR)
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+        cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        np.multiply(self.rgb.transpose(2, 0, 1), 1 / 255.0, out=self.blob[0], casting='unsafe')
+        return self.blob, scale, pad_x, pad_y
+
+    def detect(self, image):
+        blob, scale, pad_x, pad_y = self.preprocess(image)
+        # YOLOv8 output: (1, 4 + num_classes, num_anchors) with boxes as cx, cy, w, h
+        predictions = np.squeeze(self.infer(blob), axis=0).T
+        scores = predictions[:, 4:].max(axis=1)
+        keep = scores >= self.conf
+        predictions, scores = predictions[keep], scores[keep]
+        if len(scores) == 0:
+            return []
+
+        cx, cy, bw, bh = predictions[:, 0], predictions[:, 1], predictions[:, 2], predictions[:, 3]
+        x1 = (cx - bw / 2 - pad_x) / scale
+        y1 = (cy - bh / 2 - pad_y) / scale
+        widths, heights = bw / scale, bh / scale
+        rects = np.stack([x1, y1, widths, heights], axis=1).tolist()
+        indices = cv2.dnn.NMSBoxes(rects, scores.tolist(), self.conf, self.iou)
+
+        h, w = image.shape[:2]
+        detections = []
+        for i in np.array(indices).flatten():
+            x, y, bw_i, bh_i = rects[i]
+            detections.append((
+                max(0, int(x)), max(0, int(y)),
+                min(w, int(x + bw_i)), min(h, int(y + bh_i)),
+                float(scores[i])
+            ))
+        return detections
+
+class OnnxRuntimeDetector(ExportedYoloDetector):
+    def __init__(self, model_path, input_size=640, conf=0.25, iou=0.45, threads=None):
+        import onnxruntime as ort
+        super().__init__(input_size, conf, iou)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def infer(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+class OpenVinoDetector(ExportedYoloDetector):
+    def __init__(self, model_path, input_size=640, conf=0.25, iou=0.45, threads=None):
+        import openvino as ov
+        super().__init__(input_size, conf, iou)
+        core = ov.Core()
+        xml_path = next(os.path.join(model_path, name) for name in os.listdir(model_path) if name.endswith('.xml'))
+        properties = {'PERFORMANCE_HINT': 'LATENCY'}
+        if threads:
+            properties['INFERENCE_NUM_THREADS'] = threads
+        self.compiled_model = core.compile_model(core.read_model(xml_path), 'CPU', properties)
+        self.request = self.compiled_model.create_infer_request()
+        self.output = self.compiled_model.output(0)
+
+    def infer(self, blob):
+        return self.request.infer({0: blob})[self.output]
+
+BACKENDS = {
+    'pytorch': (UltralyticsDetector, None),
+    'onnxruntime': (OnnxRuntimeDetector, 'onnx'),
+    'openvino': (OpenVinoDetector, 'openvino'),
+}
+
+def export_model(model_path, export_format, input_size):
+    # One-time export next to the .pt weights; reused until the weights change
+    stem, _ = os.path.splitext(model_path)
+    if export_format == 'onnx':
+        cached_path = f"{stem}_{input_size}.onnx"
+    else:
+        cached_path = f"{stem}_{input_size}_{export_format}_model"
+    if os.path.exists(cached_path) and os.path.getmtime(cached_path) >= os.path.getmtime(model_path):
+        return cached_path
+
+    logger.info(f"Exporting {model_path} to {export_format} at {input_size}x{input_size}")
+    from ultralytics import YOLO
+    exported_path = YOLO(model_path).export(format=export_format, imgsz=input_size, dynamic=False, batch=1)
+    if os.path.isdir(cached_path):
+        shutil.rmtree(cached_path)
+    os.replace(exported_path, cached_path)
+    return cached_path
+
+def create_detector(config, model_path):
+    detector_config = config.get('detector', {})
+    backend = detector_config.get('backend', 'pytorch')
+    options = {
+        'input_size': detector_config.get('input_size', 640),
+        'conf': detector_config.get('conf', 0.25),
+        'iou': detector_config.get('iou', 0.45),
+        'threads': detector_config.get('threads'),
+    }
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend: {backend}")
+
+    detector_class, export_format = BACKENDS[backend]
+    try:
+        backend_path = export_model(model_path, export_format, options['input_size']) if export_format else model_path
+        detector = detector_class(backend_path, **options)
+    except ImportError as e:
+        logger.warning(f"Detector backend '{backend}' is unavailable ({e}), falling back to pytorch")
+        detector = UltralyticsDetector(model_path, **options)
+    logger.info(f"Using {type(detector).__name__} for license plate detection")
+    return detector
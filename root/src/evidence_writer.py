@@ -0,0 +1,104 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+class EvidenceWriter(threading.Thread):
+    # Hashes, encodes and writes evidence images into the image store off the GUI thread, records
+    # their metadata in the database, and fsyncs written files in batches rather than one by one.
+
+    def __init__(self, image_store, db_manager, max_width=None, fsync_batch_size=10, fsync_interval=2.0):
+        super().__init__(name="EvidenceWriter", daemon=True)
+        self.logger = logging.getLogger(__name__)
+        self.image_store = image_store
+        self.max_width = max_width
+        self.fsync_batch_size = fsync_batch_size
+        self.fsync_interval = fsync_interval
+        self.queue = queue.Queue()
+        self.db_manager = db_manager
+        self.unsynced = []
+        self.last_sync = time.monotonic()
+        self.images_written = 0
+        self.write_errors = 0
+
+    def submit(self, frame_image, plate_image=None):
+        # Only queues the images; the paths depend on a hash of the pixels, which is taken on this
+        # thread. Returns a Future that resolves to (frame_path, plate_path) once both are stored,
+        # with None for an image that was not given or could not be written.
+        future = Future()
+        if plate_image is not None and plate_image.size == 0:
+            plate_image = None
+        self.queue.put((future, datetime.now(), frame_image, plate_image))
+        return future
+
+    def run(self):
+        while True:
+            try:
+                job = self.queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                self.sync()
+                continue
+            if job is None:
+                break
+            self.write_event(*job)
+            if len(self.unsynced) >= self.fsync_batch_size or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self.sync()
+        self.sync()
+
+    def write_event(self, future, when, frame_image, plate_image):
+        frame_path = self.write(frame_image, when, 'frame', None, self.max_width)
+        plate_path = None
+        if plate_image is not None:
+            plate_path = self.write(plate_image, when, 'plate', frame_path, None)
+        future.set_result((frame_path, plate_path))
+
+    def write(self, image, when, kind, source_path, max_width):
+        # Returns the stored path, or None if the image could not be written
+        path = None
+        try:
+            path, content_hash = self.image_store.path_for(image, when)
+            record = self.image_store.write(path, image, max_width)
+            self.unsynced.extend([record['path'], record['thumbnail_path']])
+            self.db_manager.record_image(
+                record['path'], content_hash, kind, source_path, record['thumbnail_path'],
+                record['width'], record['height'], record['size_bytes'], wait=False
+            )
+            self.images_written += 1
+            return path
+        except Exception as e:
+            self.write_errors += 1
+            self.logger.error(f"Error writing evidence {kind} image {path}: {str(e)}", exc_info=True)
+            return None
+
+    def sync(self):
+        if not self.unsynced:
+            return
+        directories = set()
+        for path in self.unsynced:
+            directories.add(os.path.dirname(path))
+            self.fsync_path(path, os.O_RDONLY)
+        # Persist the renames as well; directories cannot be opened for fsync on Windows
+        if hasattr(os, 'O_DIRECTORY'):
+            for directory in directories:
+                self.fsync_path(directory, os.O_RDONLY | os.O_DIRECTORY)
+        self.unsynced = []
+        self.last_sync = time.monotonic()
+
+    def fsync_path(self, path, flags):
+        try:
+            fd = os.open(path, flags)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            self.logger.warning(f"Could not fsync {path}: {str(e)}")
+
+    def close(self):
+        # Drains the queue and syncs everything before returning
+        self.queue.put(None)
+        self.join()
+        self.logger.info(f"Evidence writer stopped: {self.images_written} images written, {self.write_errors} failed")
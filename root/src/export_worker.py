@@ -0,0 +1,56 @@
+import logging
+import threading
+from PyQt6.QtCore import QThread, pyqtSignal
+from export_writers import ExportFile
+
+class ExportWorker(QThread):
+    # Emits the number of rows written so far
+    progress = pyqtSignal(int)
+    # Emits (rows written, path)
+    export_finished = pyqtSignal(int, str)
+    export_failed = pyqtSignal(str)
+    export_cancelled = pyqtSignal()
+
+    def __init__(self, chunks, path, export_format, headers, format_row, parent=None):
+        # chunks is a generator of row lists, such as DatabaseManager.iter_entry_exit_logs(); it is
+        # consumed and closed on this thread
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.chunks = chunks
+        self.path = path
+        self.export_format = export_format
+        self.headers = headers
+        self.format_row = format_row
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        export = None
+        rows_written = 0
+        try:
+            export = ExportFile(self.path, self.export_format, self.headers)
+            for chunk in self.chunks:
+                if self.cancel_event.is_set():
+                    break
+                export.write_rows([self.format_row(row) for row in chunk])
+                rows_written += len(chunk)
+                self.progress.emit(rows_written)
+            if self.cancel_event.is_set():
+                export.discard()
+                self.export_cancelled.emit()
+            else:
+                export.commit()
+                self.export_finished.emit(rows_written, self.path)
+        except Exception as e:
+            self.logger.error(f"Error exporting to {self.path}: {str(e)}", exc_info=True)
+            if export is not None:
+                try:
+                    export.discard()
+                except OSError:
+                    pass
+            self.export_failed.emit(str(e))
+        finally:
+            # Returns the reader connection to the pool even when the export stopped early
+            self.chunks.close()
+
+    def cancel(self):
+        self.cancel_event.set()
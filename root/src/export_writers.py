@@ -0,0 +1,102 @@
+import csv
+import gzip
+import importlib.util
+import json
+import os
+
+# Format name -> (file dialog filter, file suffix), in the order offered to the user
+EXPORT_FORMATS = {
+    'csv': ("CSV Files (*.csv)", '.csv'),
+    'csv.gz': ("Compressed CSV Files (*.csv.gz)", '.csv.gz'),
+    'jsonl': ("JSON Lines Files (*.jsonl)", '.jsonl'),
+    'jsonl.gz': ("Compressed JSON Lines Files (*.jsonl.gz)", '.jsonl.gz'),
+    'parquet': ("Parquet Files (*.parquet)", '.parquet'),
+}
+
+def parquet_available():
+    # pyarrow is optional; Parquet is only offered when it is installed
+    return importlib.util.find_spec('pyarrow') is not None
+
+def available_formats():
+    return [name for name in EXPORT_FORMATS if name != 'parquet' or parquet_available()]
+
+def format_for_path(path, default='csv'):
+    # Longest suffix first so .csv.gz is not taken for plain .gz
+    for name, (_, suffix) in sorted(EXPORT_FORMATS.items(), key=lambda item: -len(item[1][1])):
+        if path.lower().endswith(suffix):
+            return name
+    return default
+
+class CsvSink:
+    def __init__(self, file, headers):
+        self.file = file
+        self.writer = csv.writer(file)
+        self.writer.writerow(headers)
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+class JsonLinesSink:
+    def __init__(self, file, headers):
+        self.file = file
+        self.headers = headers
+
+    def write_rows(self, rows):
+        self.file.writelines(json.dumps(dict(zip(self.headers, row)), ensure_ascii=False) + "\n" for row in rows)
+
+    def close(self):
+        self.file.close()
+
+class ParquetSink:
+    def __init__(self, path, headers):
+        import pyarrow
+        import pyarrow.parquet
+        self.pyarrow = pyarrow
+        # Every column holds the same formatted text as the CSV export
+        self.schema = pyarrow.schema([(header, pyarrow.string()) for header in headers])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write_rows(self, rows):
+        columns = [[None if value is None else str(value) for value in column] for column in zip(*rows)]
+        self.writer.write_table(self.pyarrow.Table.from_arrays(
+            [self.pyarrow.array(column, type=self.pyarrow.string()) for column in columns], schema=self.schema
+        ))
+
+    def close(self):
+        self.writer.close()
+
+class ExportFile:
+    # Writes to <path>.part and only renames it into place on commit(), so a cancelled or failed
+    # export never leaves a truncated file under the chosen name
+
+    def __init__(self, path, export_format, headers):
+        self.path = path
+        self.temp_path = path + '.part'
+        compressed = export_format.endswith('.gz')
+        base_format = export_format[:-3] if compressed else export_format
+        if base_format == 'parquet':
+            self.sink = ParquetSink(self.temp_path, headers)
+        else:
+            if compressed:
+                file = gzip.open(self.temp_path, 'wt', newline='', encoding='utf-8')
+            else:
+                file = open(self.temp_path, 'w', newline='', encoding='utf-8')
+            self.sink = CsvSink(file, headers) if base_format == 'csv' else JsonLinesSink(file, headers)
+
+    def write_rows(self, rows):
+        if rows:
+            self.sink.write_rows(rows)
+
+    def commit(self):
+        self.sink.close()
+        os.replace(self.temp_path, self.path)
+
+    def discard(self):
+        try:
+            self.sink.close()
+        finally:
+            if os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
@@ -0,0 +1,110 @@
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime
+import cv2
+
+class ImageStore:
+    # Content-addressed image files sharded by date and hash prefix:
+    #   <root>/YYYY/MM/DD/<hash[:2]>/<hash>.jpg  plus  <hash>_thumb.jpg
+    # The hash is taken over the raw pixels, so the final path is known before anything is encoded.
+
+    def __init__(self, root_dir, thumbnail_width=160, thumbnail_height=120, jpeg_quality=90):
+        self.logger = logging.getLogger(__name__)
+        self.root_dir = os.path.abspath(root_dir)
+        self.thumbnail_width = thumbnail_width
+        self.thumbnail_height = thumbnail_height
+        self.jpeg_quality = jpeg_quality
+
+    def path_for(self, image, when=None):
+        content_hash = hashlib.sha256(image.tobytes()).hexdigest()
+        when = when or datetime.now()
+        directory = os.path.join(self.root_dir, when.strftime('%Y'), when.strftime('%m'), when.strftime('%d'), content_hash[:2])
+        return os.path.join(directory, f"{content_hash}.jpg"), content_hash
+
+    @staticmethod
+    def thumbnail_path_for(path):
+        stem, ext = os.path.splitext(path)
+        return f"{stem}_thumb{ext}"
+
+    def write(self, path, image, max_width=None):
+        # Returns the metadata to record for the stored image
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        h, w = image.shape[:2]
+        if max_width and w > max_width:
+            image = cv2.resize(image, (max_width, int(h * max_width / float(w))), interpolation=cv2.INTER_AREA)
+            h, w = image.shape[:2]
+        size_bytes = self.write_jpeg(path, image)
+
+        scale = min(self.thumbnail_width / float(w), self.thumbnail_height / float(h), 1.0)
+        thumbnail = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        thumbnail_path = self.thumbnail_path_for(path)
+        self.write_jpeg(thumbnail_path, thumbnail)
+        return {
+            'path': path,
+            'thumbnail_path': thumbnail_path,
+            'width': w,
+            'height': h,
+            'size_bytes': size_bytes,
+        }
+
+    def write_jpeg(self, path, image):
+        # Identical content maps to the same path, so an existing file is already the right one
+        if os.path.exists(path):
+            return os.path.getsize(path)
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError(f"JPEG encoding failed for {path}")
+        data = encoded.tobytes()
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return len(data)
+
+    def delete(self, path):
+        for file_path in (path, self.thumbnail_path_for(path)):
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+
+    def collect_garbage(self, db_manager, min_age_seconds=86400):
+        # Removes images no longer referenced by vehicles or entry_exit, then any file under the
+        # store that has no images row. The age limit protects writes that are still in flight.
+        cutoff = time.time() - min_age_seconds
+        removed = 0
+        unreferenced = db_manager.get_unreferenced_images(cutoff)
+        for path in unreferenced:
+            self.delete(path)
+            removed += 1
+        db_manager.delete_image_records(unreferenced)
+
+        # Only the dated shard directories belong to the store; loose files in the root are left alone
+        known = db_manager.get_image_paths()
+        year_dirs = []
+        if os.path.isdir(self.root_dir):
+            for name in os.listdir(self.root_dir):
+                if name.isdigit() and os.path.isdir(os.path.join(self.root_dir, name)):
+                    year_dirs.append(os.path.join(self.root_dir, name))
+        for year_dir in year_dirs:
+            for directory, _, files in os.walk(year_dir):
+                for name in files:
+                    file_path = os.path.join(directory, name)
+                    if not name.endswith('.jpg') or name.endswith('_thumb.jpg'):
+                        continue
+                    if file_path not in known and os.path.getmtime(file_path) < cutoff:
+                        self.delete(file_path)
+                        removed += 1
+        self.logger.info(f"Image garbage collection removed {removed} images")
+        return removed
+
+def get_image_store(config):
+    image_store_config = config.get('image_store', {})
+    return ImageStore(
+        config['license_plates_dir'],
+        thumbnail_width=image_store_config.get('thumbnail_width', 160),
+        thumbnail_height=image_store_config.get('thumbnail_height', 120),
+        jpeg_quality=config.get('evidence', {}).get('jpeg_quality', 90)
+    )
@@ -0,0 +1,332 @@
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+import cv2
+import numpy as np
+from PyQt6.QtCore import QThread, pyqtSignal
+from detector_backends import create_detector
+from plate_tracker import PlateTracker
+from plate_geometry import normalize_plate
+from motion_gate import MotionGate
+from detection_region import DetectionRegion
+
+PlateDetection = namedtuple('PlateDetection', ['track_id', 'box', 'license_plate_img', 'text', 'confidence'])
+
+class CameraPipeline:
+    # Per-camera state that sits in front of the shared models: ROI, motion gate, tracker and counters
+
+    def __init__(self, camera_config, config):
+        self.camera_id = camera_config['id']
+        self.frame_shape = (camera_config['height'], camera_config['width'], 3)
+        self.detection_region = DetectionRegion(camera_config.get('roi'), camera_config.get('detection_width'))
+
+        tracking_config = config.get('tracking', {})
+        self.tracker = PlateTracker(
+            iou_threshold=tracking_config.get('iou_threshold', 0.3),
+            max_age_seconds=tracking_config.get('max_age_seconds', 2.0),
+            max_ocr_attempts=tracking_config.get('max_ocr_attempts', 5),
+            min_agreement=tracking_config.get('min_agreement', 2),
+            max_readings=tracking_config.get('max_readings', 5),
+            consensus_ratio=tracking_config.get('consensus_ratio', 0.6)
+        )
+
+        motion_config = config.get('motion', {})
+        self.motion_gate = None
+        if motion_config.get('enabled', True):
+            self.motion_gate = MotionGate(
+                downscale_width=motion_config.get('downscale_width', 160),
+                pixel_threshold=motion_config.get('pixel_threshold', 25),
+                min_changed_ratio=motion_config.get('min_changed_ratio', 0.01),
+                heartbeat_seconds=motion_config.get('heartbeat_seconds', 5.0),
+                roi=motion_config.get('roi') or camera_config.get('roi')
+            )
+
+        self.pending_frame = None
+        self.last_served = 0.0
+        self.frames_dropped = 0
+        self.frames_processed = 0
+        self.frames_detected = 0
+        self.plates_reported = 0
+        self.window_start = time.monotonic()
+        self.window_frames = 0
+
+    def reset(self):
+        self.tracker.reset()
+        if self.motion_gate:
+            self.motion_gate.reset()
+
+    def should_detect(self, frame):
+        # The gate always sees the frame so its reference stays current; tracks still waiting for a
+        # settled reading keep detection running even if the vehicle has stopped moving. A parked
+        # vehicle that was already reported keeps matching its track, so it must not count.
+        if self.motion_gate is None:
+            return True
+        moving = self.motion_gate.should_detect(frame.image, frame.timestamp)
+        return moving or any(track.needs_ocr() for track in self.tracker.tracks)
+
+    def stats(self, now):
+        elapsed = max(now - self.window_start, 1e-6)
+        stats = {
+            'fps': round(self.window_frames / elapsed, 1),
+            'processed': self.frames_processed,
+            'detected': self.frames_detected,
+            'dropped': self.frames_dropped,
+            # Frames the motion gate kept away from the detector
+            'skipped': self.motion_gate.frames_skipped if self.motion_gate else 0,
+            'reported': self.plates_reported,
+        }
+        self.window_start = now
+        self.window_frames = 0
+        return stats
+
+class InferenceWorker(QThread):
+    # Shared inference scheduler: one set of models serves every camera. Each camera keeps only its
+    # latest frame; each round takes the cameras that waited longest, detects on their frames as one
+    # batch and OCRs every crop from the round in a single recognizer call.
+    # Emits (percent, message) while the models load
+    loading_progress = pyqtSignal(int, str)
+    models_loaded = pyqtSignal()
+    model_load_failed = pyqtSignal(str)
+    # Emits (camera_id, Frame, [PlateDetection, ...]) whenever tracked plates have a settled reading
+    detections_ready = pyqtSignal(object, object, object)
+    # Emits {camera_id: {...}} with per-camera throughput every stats_interval_seconds
+    stats_updated = pyqtSignal(object)
+
+    def __init__(self, config, camera_configs, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.config = config
+        self.detector = None
+        self.ocr = None
+        self.condition = threading.Condition()
+        # Single-use thread: cleared by stop(), possibly before run() starts
+        self.running = True
+        self.reset_requested = set()
+        self.ocr_calls = 0
+        self.pipelines = {camera['id']: CameraPipeline(camera, config) for camera in camera_configs}
+
+        scheduler_config = config.get('scheduler', {})
+        self.max_batch_size = scheduler_config.get('max_batch_size') or len(self.pipelines)
+        self.stats_interval = scheduler_config.get('stats_interval_seconds', 5.0)
+        self.last_stats = time.monotonic()
+
+        self.sharpness_reference = config.get('tracking', {}).get('sharpness_reference', 100.0)
+        ocr_config = config.get('ocr', {})
+        self.ocr_use_det = ocr_config.get('det', False)
+        self.ocr_use_cls = ocr_config.get('cls', False)
+        self.ocr_deskew = ocr_config.get('deskew', True)
+        self.ocr_input_height = ocr_config.get('input_height', 48)
+
+    def setup_models(self):
+        # Runs on the worker thread; the heavy framework imports happen here rather than at import time
+        started = time.perf_counter()
+        self.loading_progress.emit(5, "Loading license plate detector...")
+        model_path = os.path.join(os.path.dirname(__file__), '..', self.config['models']['license_plate'])
+        self.detector = create_detector(self.config, model_path)
+        # stop() waits for this thread; a single stage cannot be interrupted, but the rest are skipped
+        if not self.running:
+            return
+
+        self.loading_progress.emit(50, "Loading OCR models...")
+        from paddleocr import PaddleOCR
+        ocr_config = self.config.get('ocr', {})
+        # The angle classifier is only loaded when it will actually be used
+        self.ocr = PaddleOCR(use_angle_cls=self.ocr_use_cls, lang=ocr_config.get('lang', 'en'),
+                             use_gpu=ocr_config.get('use_gpu', False),
+                             rec_batch_num=ocr_config.get('rec_batch_num', 16))
+        self.logger.info(f"Models loaded in {time.perf_counter() - started:.2f}s")
+        if not self.running:
+            return
+
+        self.loading_progress.emit(80, "Warming up models...")
+        try:
+            self.warm_up()
+        except Exception as e:
+            # A failed warm-up only costs latency on the first real frame
+            self.logger.warning(f"Model warm-up failed: {str(e)}", exc_info=True)
+        self.loading_progress.emit(100, "Models ready")
+
+    def warm_up(self):
+        # The first inference pays for lazy framework init, kernel selection and allocator growth.
+        # Pay it here, on dummy frames shaped like the real ones, instead of on the first car.
+        iterations = self.config.get('warmup_iterations', 2)
+        pipelines = list(self.pipelines.values())
+        frames = [np.zeros(pipeline.frame_shape, dtype=np.uint8) for pipeline in pipelines]
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            if not self.running:
+                return
+            self.detector.detect_batch([
+                pipeline.detection_region.prepare(frame)[0] for pipeline, frame in zip(pipelines, frames)
+            ])
+        detector_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        crops = [np.full((self.ocr_input_height, self.ocr_input_height * 4, 3), 255, dtype=np.uint8)] * max(1, len(pipelines))
+        for _ in range(iterations):
+            if not self.running:
+                return
+            self.recognize_license_plates(crops)
+        ocr_time = time.perf_counter() - started
+        self.logger.info(f"Warm-up finished: detector {detector_time * 1000:.0f} ms, "
+                         f"OCR {ocr_time * 1000:.0f} ms over {iterations} iterations")
+
+    def submit_frame(self, camera_id, frame):
+        # Latest frame wins per camera: a frame that was never picked up is replaced, not queued
+        with self.condition:
+            pipeline = self.pipelines[camera_id]
+            if pipeline.pending_frame is not None:
+                pipeline.frames_dropped += 1
+            pipeline.pending_frame = frame
+            self.condition.notify()
+
+    def reset_tracking(self, camera_id):
+        # Applied by the worker thread before it processes the camera's next frame
+        with self.condition:
+            self.reset_requested.add(camera_id)
+            self.pipelines[camera_id].pending_frame = None
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.wait()
+
+    def has_pending_frames(self):
+        return any(pipeline.pending_frame is not None for pipeline in self.pipelines.values())
+
+    def run(self):
+        try:
+            self.setup_models()
+        except Exception as e:
+            self.logger.error(f"Error loading models: {str(e)}", exc_info=True)
+            self.model_load_failed.emit(str(e))
+            return
+        if not self.running:
+            self.logger.info("Stopped while loading models")
+            return
+        self.models_loaded.emit()
+
+        while True:
+            with self.condition:
+                while self.running and not self.has_pending_frames():
+                    self.condition.wait()
+                if not self.running:
+                    break
+                for camera_id in self.reset_requested:
+                    self.pipelines[camera_id].reset()
+                self.reset_requested.clear()
+                batch = self.take_batch()
+
+            try:
+                results = self.process_batch(batch)
+            except Exception as e:
+                self.logger.error(f"Error processing frames: {str(e)}", exc_info=True)
+                continue
+            for pipeline, frame, detections in results:
+                if detections:
+                    self.detections_ready.emit(pipeline.camera_id, frame, detections)
+            self.emit_stats()
+
+    def take_batch(self):
+        # Fairness: serve the cameras that have waited longest first
+        ready = [pipeline for pipeline in self.pipelines.values() if pipeline.pending_frame is not None]
+        ready.sort(key=lambda pipeline: pipeline.last_served)
+        now = time.monotonic()
+        batch = []
+        for pipeline in ready[:self.max_batch_size]:
+            batch.append((pipeline, pipeline.pending_frame))
+            pipeline.pending_frame = None
+            pipeline.last_served = now
+        return batch
+
+    def process_batch(self, batch):
+        for pipeline, frame in batch:
+            pipeline.frames_processed += 1
+            pipeline.window_frames += 1
+        gated = [(pipeline, frame) for pipeline, frame in batch if pipeline.should_detect(frame)]
+        if not gated:
+            return []
+
+        detected = self.detect_license_plates([(pipeline, frame.image) for pipeline, frame in gated])
+
+        # OCR each tracked plate only until its reading settles, all crops of the round in one batch
+        pending = []
+        for (pipeline, frame), license_plates in zip(gated, detected):
+            pipeline.frames_detected += 1
+            boxes = [box for box, _ in license_plates]
+            for track, box_index in pipeline.tracker.update(boxes, frame.timestamp):
+                box, license_plate_img = license_plates[box_index]
+                if track.needs_ocr() and license_plate_img.size > 0:
+                    pending.append((pipeline, track, box, license_plate_img))
+
+        detections = {pipeline.camera_id: [] for pipeline, _ in gated}
+        if pending:
+            self.ocr_calls += 1
+            readings = self.recognize_license_plates([license_plate_img for _, _, _, license_plate_img in pending])
+            for (pipeline, track, box, license_plate_img), (text, confidence) in zip(pending, readings):
+                track.add_reading(text, confidence, self.measure_sharpness(license_plate_img))
+                if track.is_ready():
+                    track.reported = True
+                    pipeline.plates_reported += 1
+                    detections[pipeline.camera_id].append(PlateDetection(
+                        track.track_id, box, license_plate_img, track.fused_text(), track.voter.confidence()
+                    ))
+        return [(pipeline, frame, detections[pipeline.camera_id]) for pipeline, frame in gated]
+
+    def emit_stats(self):
+        now = time.monotonic()
+        if now - self.last_stats < self.stats_interval:
+            return
+        self.last_stats = now
+        stats = {camera_id: pipeline.stats(now) for camera_id, pipeline in self.pipelines.items()}
+        self.logger.debug(f"Inference throughput: {stats}, OCR calls: {self.ocr_calls}")
+        self.stats_updated.emit(stats)
+
+    def measure_sharpness(self, image):
+        # Variance of the Laplacian, squashed into (0, 1) so blurry crops carry less weight
+        if image.size == 0:
+            return 0.0
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        variance = cv2.Laplacian(gray, cv2.CV_64F).var()
+        return variance / (variance + self.sharpness_reference)
+
+    def detect_license_plates(self, items):
+        # items is a list of (pipeline, full-resolution image). Detect on each camera's (downscaled)
+        # lane region in one batch, then crop OCR input from the full-resolution frames.
+        prepared = [pipeline.detection_region.prepare(image) for pipeline, image in items]
+        batch_detections = self.detector.detect_batch([detection_image for detection_image, _ in prepared])
+        results = []
+        for (pipeline, image), (_, transform), detections in zip(items, prepared, batch_detections):
+            license_plates = []
+            for x1, y1, x2, y2, score in pipeline.detection_region.to_full_resolution(detections, transform, image.shape):
+                license_plate_img = image[y1:y2, x1:x2]
+                license_plates.append(((x1, y1, x2, y2), license_plate_img))
+            results.append(license_plates)
+        return results
+
+    def recognize_license_plates(self, images):
+        # Returns one (text, confidence) per image
+        if self.ocr_use_det:
+            return [self.recognize_license_plate(image) for image in images]
+
+        # YOLO already localized the plates, so skip PaddleOCR's text detector and run the
+        # recognizer once over the whole list of normalized crops
+        images = [normalize_plate(image, self.ocr_deskew, self.ocr_input_height) for image in images]
+        result = self.ocr.ocr(images, det=False, cls=self.ocr_use_cls)
+        readings = []
+        for text, confidence in result[0]:
+            readings.append((text or None, float(confidence)))
+        return readings
+
+    def recognize_license_plate(self, image):
+        # Full detection + recognition on a single crop; multi-line plates are joined and their scores averaged
+        result = self.ocr.ocr(image, det=True, cls=self.ocr_use_cls)
+        if result[0]:
+            text = ''.join([line[1][0] for line in result[0]])
+            confidence = sum(line[1][1] for line in result[0]) / len(result[0])
+            return text, confidence
+        return None, 0.0
@@ -1,8 +1,11 @@
+import time
+STARTUP_TIME = time.perf_counter()
+
 import sys
 import logging
 import os
 from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import QFile, QTextStream
+from PyQt6.QtCore import QFile, QTextStream, QTimer
 from config import load_config
 from ui.main_window import MainWindow
 
@@ -36,6 +39,15 @@ def load_stylesheet(path):
     logger.info(f"Stylesheet loaded successfully. Length: {len(stylesheet)} characters")
     return stylesheet
 
+def log_time_to_first_window(config):
+    logger = logging.getLogger(__name__)
+    elapsed = time.perf_counter() - STARTUP_TIME
+    target = config.get('startup_target_seconds', 2.0)
+    if elapsed > target:
+        logger.warning(f"Time to first window: {elapsed:.2f}s (target {target:.2f}s)")
+    else:
+        logger.info(f"Time to first window: {elapsed:.2f}s (target {target:.2f}s)")
+
 def main():
     setup_logging()
     logger = logging.getLogger(__name__)
@@ -52,6 +64,8 @@ def main():
         
         window = MainWindow(config)
         window.showMaximized()
+        # Fires on the first event loop iteration, i.e. once the window has actually been shown
+        QTimer.singleShot(0, lambda: log_time_to_first_window(config))
         sys.exit(app.exec())
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}", exc_info=True)
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+class MotionGate:
+    def __init__(self, downscale_width=160, pixel_threshold=25, min_changed_ratio=0.01,
+                 heartbeat_seconds=5.0, roi=None):
+        self.downscale_width = downscale_width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.heartbeat_seconds = heartbeat_seconds
+        # Optional polygon [[x, y], ...] in full-resolution pixel coordinates
+        self.roi = roi
+        self.mask = None
+        self.mask_pixels = 0
+        self.previous = None
+        self.last_triggered = None
+        self.frames_skipped = 0
+
+    def prepare(self, image):
+        h, w = image.shape[:2]
+        scale = self.downscale_width / float(w)
+        small = cv2.resize(image, (self.downscale_width, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        if self.mask is None or self.mask.shape != gray.shape:
+            self.build_mask(gray.shape, scale)
+        return gray
+
+    def build_mask(self, shape, scale):
+        if self.roi:
+            self.mask = np.zeros(shape, dtype=np.uint8)
+            points = np.array([[int(x * scale), int(y * scale)] for x, y in self.roi], dtype=np.int32)
+            cv2.fillPoly(self.mask, [points], 255)
+        else:
+            self.mask = np.full(shape, 255, dtype=np.uint8)
+        self.mask_pixels = max(1, cv2.countNonZero(self.mask))
+
+    def should_detect(self, image, timestamp):
+        # Cheap frame differencing on a downscaled grayscale frame, restricted to the ROI
+        gray = self.prepare(image)
+        previous, self.previous = self.previous, gray
+        if previous is None:
+            return self.trigger(timestamp)
+
+        diff = cv2.absdiff(gray, previous)
+        _, changed = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        changed = cv2.bitwise_and(changed, self.mask)
+        if cv2.countNonZero(changed) / float(self.mask_pixels) >= self.min_changed_ratio:
+            return self.trigger(timestamp)
+
+        # Heartbeat so a vehicle that stopped before the gate started is still picked up
+        if self.heartbeat_seconds and timestamp - self.last_triggered >= self.heartbeat_seconds:
+            return self.trigger(timestamp)
+        self.frames_skipped += 1
+        return False
+
+    def trigger(self, timestamp):
+        self.last_triggered = timestamp
+        return True
+
+    def reset(self):
+        self.previous = None
+        self.last_triggered = None
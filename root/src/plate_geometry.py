@@ -0,0 +1,44 @@
+import math
+import cv2
+import numpy as np
+
+def estimate_skew_angle(image, max_angle=20.0):
+    # Median angle of the near-horizontal edges (plate border, character baselines), in degrees
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    edges = cv2.Canny(gray, 50, 150)
+    min_length = max(10, gray.shape[1] // 3)
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=30, minLineLength=min_length, maxLineGap=5)
+    if lines is None:
+        return 0.0
+    angles = []
+    for x1, y1, x2, y2 in lines[:, 0]:
+        angle = math.degrees(math.atan2(y2 - y1, x2 - x1))
+        if abs(angle) <= max_angle:
+            angles.append(angle)
+    if not angles:
+        return 0.0
+    return float(np.median(angles))
+
+def deskew_plate(image, max_angle=20.0):
+    angle = estimate_skew_angle(image, max_angle)
+    if abs(angle) < 0.5:
+        return image
+    h, w = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+def resize_to_height(image, height):
+    h, w = image.shape[:2]
+    if h == height:
+        return image
+    width = max(1, int(round(w * height / float(h))))
+    interpolation = cv2.INTER_AREA if h > height else cv2.INTER_CUBIC
+    return cv2.resize(image, (width, height), interpolation=interpolation)
+
+def normalize_plate(image, deskew=True, height=48):
+    # Straighten the crop and bring it to the recognizer's input height so batches need little padding
+    if deskew:
+        image = deskew_plate(image)
+    if height:
+        image = resize_to_height(image, height)
+    return image
@@ -0,0 +1,121 @@
+import threading
+from plate_text import OCR_CONFUSIONS, normalize_plate_text, plate_search_key
+
+# Substituting one OCR-confusable character for another (such as O for 0, or B for 8) costs this
+# much; every other substitution, insertion or deletion costs 1
+CONFUSION_COST = 0.25
+
+def substitution_cost(a, b):
+    if a == b:
+        return 0.0
+    if OCR_CONFUSIONS.get(a, a) == OCR_CONFUSIONS.get(b, b):
+        return CONFUSION_COST
+    return 1.0
+
+def plate_distance(a, b):
+    # Weighted Levenshtein distance between two normalized plate texts
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        current = [float(i)]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1.0,
+                current[j - 1] + 1.0,
+                previous[j - 1] + substitution_cost(char_a, char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+def deletion_variants(key):
+    # The key itself and every string one deletion away from it
+    return {key} | {key[:i] + key[i + 1:] for i in range(len(key))}
+
+class PlateIndex:
+    # Symmetric-delete index over registered plate numbers. Plates are stored under their search
+    # key, which already folds OCR-confusable characters together, and under every variant of
+    # that key with one character deleted. Two keys within one edit of each other always share a
+    # variant, so a lookup is a dozen dictionary probes however large the registry grows; the few
+    # candidates found are then ranked by plate_distance().
+    #
+    # Because the index finds at most one edit beyond confusable characters, max_distance is
+    # capped below 2.
+
+    def __init__(self, plates=(), max_distance=1.5):
+        self.max_distance = min(max_distance, 1.99)
+        self.lock = threading.Lock()
+        # search key -> registered plate numbers with that key (usually one)
+        self.plates = {}
+        # deletion variant -> the search key that produces it, or a set when several keys do; most
+        # variants belong to a single plate, and a set for each would dominate the index's memory
+        self.variants = {}
+        for plate in plates:
+            self.add(plate)
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(plates) for plates in self.plates.values())
+
+    def add(self, plate):
+        key = plate_search_key(plate)
+        if not key:
+            return
+        with self.lock:
+            if key not in self.plates:
+                self.plates[key] = set()
+                for variant in deletion_variants(key):
+                    keys = self.variants.get(variant)
+                    if keys is None:
+                        self.variants[variant] = key
+                    elif isinstance(keys, str):
+                        self.variants[variant] = {keys, key}
+                    else:
+                        keys.add(key)
+            self.plates[key].add(plate)
+
+    def remove(self, plate):
+        key = plate_search_key(plate)
+        with self.lock:
+            plates = self.plates.get(key)
+            if plates is None:
+                return
+            plates.discard(plate)
+            if plates:
+                return
+            del self.plates[key]
+            for variant in deletion_variants(key):
+                keys = self.variants[variant]
+                if isinstance(keys, str):
+                    del self.variants[variant]
+                else:
+                    keys.discard(key)
+                    if len(keys) == 1:
+                        self.variants[variant] = keys.pop()
+
+    def candidates(self, text, limit=5):
+        # Registered plates within max_distance of text as (plate, distance), closest first
+        text = normalize_plate_text(text or '')
+        key = plate_search_key(text)
+        if not key:
+            return []
+        with self.lock:
+            keys = set()
+            for variant in deletion_variants(key):
+                found = self.variants.get(variant)
+                if isinstance(found, str):
+                    keys.add(found)
+                elif found:
+                    keys.update(found)
+            plates = [plate for candidate_key in keys for plate in self.plates[candidate_key]]
+
+        matches = []
+        for plate in plates:
+            distance = plate_distance(text, normalize_plate_text(plate))
+            if distance <= self.max_distance:
+                matches.append((plate, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches[:limit]
+
+    def closest(self, text):
+        # The best (plate, distance) match, or None when no registered plate is close enough
+        matches = self.candidates(text, limit=1)
+        return matches[0] if matches else None
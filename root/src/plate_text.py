@@ -0,0 +1,35 @@
+# Plate number text handling shared by OCR voting, the database search index and the plate index
+
+def normalize_plate_text(text):
+    return ''.join(ch for ch in text.upper() if ch.isalnum())
+
+# Letters OCR commonly reads in place of a digit (and the other way round), mapped to that digit
+OCR_CONFUSIONS = {'O': '0', 'Q': '0', 'D': '0', 'I': '1', 'L': '1', 'Z': '2', 'S': '5', 'G': '6', 'B': '8'}
+
+# Separators and punctuation people type into plate numbers; the search key drops them. The list
+# is fixed rather than "everything but letters and digits" because plate_search_key_sql() spells
+# out one nested replace() per character and SQLite caps how deeply calls can nest.
+PLATE_KEY_DROPPED = ' -./_,:;\'"()#\t\\|*'
+
+def plate_search_key(text):
+    # Readings that differ only by confusable characters or separators, such as MH12AB1234 and
+    # MH-1ZA81Z34, share a key
+    key = []
+    for ch in text or '':
+        if ch in PLATE_KEY_DROPPED:
+            continue
+        if ch < '\x80':
+            ch = ch.upper()
+        key.append(OCR_CONFUSIONS.get(ch, ch))
+    return ''.join(key)
+
+def plate_search_key_sql(expression):
+    # plate_search_key() as a plain SQL expression, for the search index triggers and the search
+    # fallback; built from the same tables so the two cannot drift apart. Only ASCII is uppercased
+    # on both sides, since that is all SQLite's upper() folds.
+    expression = f"upper({expression})"
+    for ch in PLATE_KEY_DROPPED:
+        expression = f"replace({expression}, char({ord(ch)}), '')"
+    for letter, digit in OCR_CONFUSIONS.items():
+        expression = f"replace({expression}, '{letter}', '{digit}')"
+    return expression
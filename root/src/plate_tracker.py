@@ -0,0 +1,93 @@
+from plate_voting import PlateVoter
+
+def box_iou(box_a, box_b):
+    x1 = max(box_a[0], box_b[0])
+    y1 = max(box_a[1], box_b[1])
+    x2 = min(box_a[2], box_b[2])
+    y2 = min(box_a[3], box_b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    if intersection == 0:
+        return 0.0
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return intersection / float(area_a + area_b - intersection)
+
+class PlateTrack:
+    def __init__(self, track_id, box, timestamp, max_ocr_attempts, voter):
+        self.track_id = track_id
+        self.box = box
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.hits = 1
+        self.max_ocr_attempts = max_ocr_attempts
+        self.ocr_attempts = 0
+        self.voter = voter
+        self.reported = False
+
+    def update(self, box, timestamp):
+        self.box = box
+        self.last_seen = timestamp
+        self.hits += 1
+
+    def needs_ocr(self):
+        return not self.reported and self.ocr_attempts < self.max_ocr_attempts
+
+    def add_reading(self, text, confidence, sharpness):
+        self.ocr_attempts += 1
+        self.voter.add(text, confidence, sharpness)
+
+    def fused_text(self):
+        return self.voter.result()
+
+    def is_ready(self):
+        # Ready as soon as the weighted vote reaches consensus, or once the OCR budget is spent
+        if self.reported or not self.voter.readings:
+            return False
+        return self.voter.has_consensus() or self.ocr_attempts >= self.max_ocr_attempts
+
+class PlateTracker:
+    def __init__(self, iou_threshold=0.3, max_age_seconds=2.0, max_ocr_attempts=5, min_agreement=2,
+                 max_readings=5, consensus_ratio=0.6):
+        self.iou_threshold = iou_threshold
+        self.max_age_seconds = max_age_seconds
+        self.max_ocr_attempts = max_ocr_attempts
+        self.min_agreement = min_agreement
+        self.max_readings = max_readings
+        self.consensus_ratio = consensus_ratio
+        self.tracks = []
+        self.next_track_id = 1
+
+    def update(self, boxes, timestamp):
+        # Greedy IoU association between existing tracks and this frame's boxes.
+        # Returns a list of (track, box_index) for every box in the frame.
+        candidates = []
+        for track_index, track in enumerate(self.tracks):
+            for box_index, box in enumerate(boxes):
+                iou = box_iou(track.box, box)
+                if iou >= self.iou_threshold:
+                    candidates.append((iou, track_index, box_index))
+        candidates.sort(reverse=True)
+
+        matched_tracks = set()
+        matched_boxes = {}
+        for iou, track_index, box_index in candidates:
+            if track_index in matched_tracks or box_index in matched_boxes:
+                continue
+            track = self.tracks[track_index]
+            track.update(boxes[box_index], timestamp)
+            matched_tracks.add(track_index)
+            matched_boxes[box_index] = track
+
+        for box_index, box in enumerate(boxes):
+            if box_index not in matched_boxes:
+                voter = PlateVoter(self.max_readings, self.min_agreement, self.consensus_ratio)
+                track = PlateTrack(self.next_track_id, box, timestamp, self.max_ocr_attempts, voter)
+                self.next_track_id += 1
+                self.tracks.append(track)
+                matched_boxes[box_index] = track
+
+        self.tracks = [track for track in self.tracks if timestamp - track.last_seen <= self.max_age_seconds]
+        return [(matched_boxes[box_index], box_index) for box_index in range(len(boxes))]
+
+    def reset(self):
+        self.tracks = []
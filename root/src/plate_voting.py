@@ -0,0 +1,70 @@
+from collections import defaultdict, namedtuple
+from plate_text import normalize_plate_text
+
+PlateReading = namedtuple('PlateReading', ['text', 'confidence', 'sharpness', 'weight'])
+
+class PlateVoter:
+    def __init__(self, max_readings=5, min_agreement=2, consensus_ratio=0.6):
+        self.max_readings = max_readings
+        self.min_agreement = min_agreement
+        self.consensus_ratio = consensus_ratio
+        self.readings = []
+
+    def add(self, text, confidence, sharpness=1.0):
+        text = normalize_plate_text(text or '')
+        if not text:
+            return
+        weight = confidence * sharpness
+        self.readings.append(PlateReading(text, confidence, sharpness, weight))
+        # Only the best crops get a vote
+        self.readings.sort(key=lambda reading: reading.weight, reverse=True)
+        del self.readings[self.max_readings:]
+
+    def string_scores(self):
+        scores = defaultdict(float)
+        for reading in self.readings:
+            scores[reading.text] += reading.weight
+        return scores
+
+    def has_consensus(self):
+        scores = self.string_scores()
+        if not scores:
+            return False
+        best_text = max(scores, key=scores.get)
+        total = sum(scores.values())
+        agreeing = sum(1 for reading in self.readings if reading.text == best_text)
+        return agreeing >= self.min_agreement and total > 0 and scores[best_text] / total >= self.consensus_ratio
+
+    def vote(self):
+        # Returns (text, shares): the voted string and, for each of its characters, the share of the
+        # total reading weight that voted for it
+        if not self.readings:
+            return None, []
+        # Vote on the length first, then character by character among readings of that length
+        length_scores = defaultdict(float)
+        for reading in self.readings:
+            length_scores[len(reading.text)] += reading.weight
+        length = max(length_scores, key=length_scores.get)
+        candidates = [reading for reading in self.readings if len(reading.text) == length]
+        total = sum(reading.weight for reading in self.readings)
+
+        characters = []
+        shares = []
+        for position in range(length):
+            char_scores = defaultdict(float)
+            for reading in candidates:
+                char_scores[reading.text[position]] += reading.weight
+            character = max(char_scores, key=char_scores.get)
+            characters.append(character)
+            # Readings of another length count against every position
+            shares.append(char_scores[character] / total if total else 0.0)
+        return ''.join(characters), shares
+
+    def result(self):
+        return self.vote()[0]
+
+    def confidence(self):
+        # The weakest character's share of the vote; the voted string may be one no single reading
+        # produced, so it cannot be looked up in string_scores()
+        _, shares = self.vote()
+        return min(shares) if shares else 0.0
@@ -0,0 +1,226 @@
+import logging
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime
+from plate_text import plate_search_key_sql
+
+# apply(cursor) changes the schema and must be safe to run again on a database it already ran on.
+# backfill(cursor, batch_size) updates at most batch_size rows and returns how many it changed; it
+# runs in the background after startup, one short transaction per batch, until it returns 0.
+# Schema steps never wait for earlier backfills, so later steps must not depend on their data.
+Migration = namedtuple('Migration', ['version', 'name', 'apply', 'backfill'])
+
+def add_missing_columns(cursor, table, columns):
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing_columns = {row[1] for row in cursor.fetchall()}
+    for column, column_type in columns.items():
+        if column not in existing_columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+def create_base_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vehicles (
+            vehicle_number TEXT PRIMARY KEY,
+            vehicle_type TEXT,
+            vehicle_color TEXT,
+            owner_name TEXT,
+            owner_aadhar TEXT,
+            affiliation TEXT,
+            image_path TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS entry_exit (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            vehicle_number TEXT,
+            in_time TIMESTAMP,
+            out_time TIMESTAMP,
+            FOREIGN KEY (vehicle_number) REFERENCES vehicles (vehicle_number)
+        )
+    ''')
+
+def add_evidence_image_columns(cursor):
+    add_missing_columns(cursor, 'entry_exit', {'entry_image_path': 'TEXT', 'exit_image_path': 'TEXT'})
+
+def create_images_table(cursor):
+    # Metadata for files in the image store; plate crops point at the frame they came from
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS images (
+            path TEXT PRIMARY KEY,
+            content_hash TEXT,
+            kind TEXT,
+            source_path TEXT,
+            thumbnail_path TEXT,
+            width INTEGER,
+            height INTEGER,
+            size_bytes INTEGER,
+            created_at TIMESTAMP
+        )
+    ''')
+
+def epoch_ms_sql(column):
+    # Converts a datetime string written by an older version (naive local time) to epoch
+    # milliseconds and leaves values that are already numbers alone
+    return (f"(CASE WHEN typeof({column}) = 'text' "
+            f"THEN CAST(round((julianday({column}, 'utc') - 2440587.5) * 86400000) AS INTEGER) "
+            f"ELSE {column} END)")
+
+def create_entry_exit_indexes(cursor):
+    # Every recognition looks up the plate's open entry; the partial index only holds vehicles
+    # currently inside, so it stays small however long the log grows
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_entry_exit_open ON entry_exit (vehicle_number, in_time) WHERE out_time IS NULL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_entry_exit_in_time ON entry_exit (in_time)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_entry_exit_vehicle ON entry_exit (vehicle_number, in_time)")
+
+def add_duration_column(cursor):
+    # in_time and out_time keep their declared TIMESTAMP type but hold epoch milliseconds from here on
+    add_missing_columns(cursor, 'entry_exit', {'duration_ms': 'INTEGER'})
+
+def convert_entry_exit_timestamps(cursor, batch_size):
+    # Text sorts after every number, so the in_time index finds the rows still to convert directly
+    cursor.execute(f'''
+        UPDATE entry_exit
+        SET in_time = {epoch_ms_sql('in_time')},
+            out_time = {epoch_ms_sql('out_time')},
+            duration_ms = {epoch_ms_sql('out_time')} - {epoch_ms_sql('in_time')}
+        WHERE id IN (SELECT id FROM entry_exit WHERE in_time >= '' LIMIT ?)
+    ''', (batch_size,))
+    return cursor.rowcount
+
+# Columns of vehicle_search after plate_key, copied from vehicles
+VEHICLE_SEARCH_COLUMNS = ['vehicle_number', 'owner_name', 'owner_aadhar', 'vehicle_type', 'vehicle_color', 'affiliation']
+
+def vehicle_search_values_sql(row):
+    return ", ".join([f"{row}.rowid", plate_search_key_sql(f"{row}.vehicle_number")] + [f"{row}.{column}" for column in VEHICLE_SEARCH_COLUMNS])
+
+def create_vehicle_search_index(cursor):
+    # A trigram FTS5 table matches any substring of three or more characters through the index.
+    # Rows share the rowid of their vehicle, which add_vehicle's upsert keeps stable.
+    columns = ", ".join(['plate_key'] + VEHICLE_SEARCH_COLUMNS)
+    try:
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS vehicle_search USING fts5({columns}, tokenize='trigram')")
+    except sqlite3.OperationalError:
+        # SQLite before 3.34 or built without FTS5: same columns in a plain table, searched with LIKE
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS vehicle_search ({columns})")
+    # The key expression is baked into the triggers, so they need no Python function registered
+    insert = f"INSERT INTO vehicle_search (rowid, {columns}) VALUES ({vehicle_search_values_sql('NEW')});"
+    delete = "DELETE FROM vehicle_search WHERE rowid = OLD.rowid;"
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS vehicles_search_insert AFTER INSERT ON vehicles BEGIN {insert} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS vehicles_search_update AFTER UPDATE ON vehicles BEGIN {delete} {insert} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS vehicles_search_delete AFTER DELETE ON vehicles BEGIN {delete} END")
+
+def index_existing_vehicles(cursor, batch_size):
+    columns = ", ".join(['plate_key'] + VEHICLE_SEARCH_COLUMNS)
+    cursor.execute(f'''
+        INSERT INTO vehicle_search (rowid, {columns})
+        SELECT {vehicle_search_values_sql('v')} FROM vehicles v
+        WHERE NOT EXISTS (SELECT 1 FROM vehicle_search s WHERE s.rowid = v.rowid)
+        LIMIT ?
+    ''', (batch_size,))
+    return cursor.rowcount
+
+def create_entry_exit_sort_indexes(cursor):
+    # One index per sortable report column, on exactly the (sort expression, id) key that
+    # DatabaseManager.entry_exit_sort_sql() pages by, so scrolling a sorted log never re-sorts it.
+    # in_time is covered by idx_entry_exit_in_time, whose implicit rowid is the id.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_entry_exit_vehicle_id ON entry_exit (vehicle_number, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_entry_exit_out_time ON entry_exit (COALESCE(out_time, -1), id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_entry_exit_duration ON entry_exit (COALESCE(duration_ms, -1), id)")
+
+EPOCH_TIMESTAMPS_VERSION = 5
+VEHICLE_SEARCH_VERSION = 6
+ENTRY_EXIT_SORT_INDEXES_VERSION = 7
+
+# Ordered by version; new migrations are appended with the next version number
+MIGRATIONS = [
+    Migration(1, 'create base tables', create_base_tables, None),
+    Migration(2, 'entry/exit evidence image columns', add_evidence_image_columns, None),
+    Migration(3, 'images table', create_images_table, None),
+    Migration(4, 'entry_exit indexes', create_entry_exit_indexes, None),
+    Migration(EPOCH_TIMESTAMPS_VERSION, 'entry_exit epoch millisecond timestamps', add_duration_column, convert_entry_exit_timestamps),
+    Migration(VEHICLE_SEARCH_VERSION, 'vehicle search index', create_vehicle_search_index, index_existing_vehicles),
+    Migration(ENTRY_EXIT_SORT_INDEXES_VERSION, 'entry_exit sort indexes', create_entry_exit_sort_indexes, None),
+]
+
+class SchemaMigrator:
+    def __init__(self, db_manager, migrations=MIGRATIONS, batch_size=1000):
+        self.logger = logging.getLogger(__name__)
+        self.db_manager = db_manager
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+        self.batch_size = batch_size
+        self.applied = set()
+        self.pending_backfills = []
+        self.stop_event = threading.Event()
+        self.backfill_thread = None
+
+    def applied_versions(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT,
+                applied_at TIMESTAMP
+            )
+        ''')
+        cursor.execute("SELECT version FROM schema_version")
+        return {row[0] for row in cursor.fetchall()}
+
+    def record(self, cursor, migration):
+        cursor.execute(
+            "INSERT OR REPLACE INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+            (migration.version, migration.name, datetime.now())
+        )
+
+    def migrate(self):
+        # Each step commits on its own, so a failure leaves the earlier steps applied and recorded
+        with self.db_manager.writing() as cursor:
+            self.applied = self.applied_versions(cursor)
+        for migration in self.migrations:
+            if migration.version in self.applied:
+                continue
+            with self.db_manager.writing() as cursor:
+                if migration.apply:
+                    migration.apply(cursor)
+                if migration.backfill is None:
+                    self.record(cursor, migration)
+            if migration.backfill is None:
+                self.applied.add(migration.version)
+                self.logger.info(f"Applied schema migration {migration.version}: {migration.name}")
+            else:
+                self.pending_backfills.append(migration)
+
+    def is_applied(self, version):
+        return version in self.applied
+
+    def start_backfills(self):
+        if not self.pending_backfills:
+            return
+        self.backfill_thread = threading.Thread(target=self.run_backfills, name="SchemaBackfill", daemon=True)
+        self.backfill_thread.start()
+
+    def run_backfills(self):
+        # Short batches keep the writer lock free for gate events in between
+        for migration in self.pending_backfills:
+            total = 0
+            while not self.stop_event.is_set():
+                try:
+                    with self.db_manager.writing() as cursor:
+                        changed = migration.backfill(cursor, self.batch_size)
+                        if not changed:
+                            self.record(cursor, migration)
+                except Exception as e:
+                    self.logger.error(f"Backfill {migration.version} ({migration.name}) failed: {str(e)}", exc_info=True)
+                    return
+                if not changed:
+                    self.applied.add(migration.version)
+                    self.logger.info(f"Applied schema migration {migration.version}: {migration.name} ({total} rows)")
+                    break
+                total += changed
+            if self.stop_event.is_set():
+                # Resumes where it stopped on the next start
+                return
+
+    def stop(self):
+        self.stop_event.set()
+        if self.backfill_thread is not None:
+            self.backfill_thread.join()
@@ -0,0 +1,27 @@
+import time
+from datetime import datetime
+
+# entry_exit stores times as integer milliseconds since the Unix epoch
+
+def now_ms():
+    return int(time.time() * 1000)
+
+def to_epoch_ms(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+def from_epoch_ms(value):
+    return datetime.fromtimestamp(value / 1000.0)
+
+def format_timestamp(value):
+    return from_epoch_ms(value).strftime("%Y-%m-%d %H:%M:%S") if value is not None else "N/A"
+
+def format_duration(duration_ms):
+    # Hours keep counting past a day rather than wrapping
+    if duration_ms is None:
+        return "N/A"
+    total_seconds = max(0, int(duration_ms // 1000))
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
@@ -0,0 +1,36 @@
+from PyQt6.QtCore import Qt, QEvent, QModelIndex, pyqtSignal
+from PyQt6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton
+
+class ButtonDelegate(QStyledItemDelegate):
+    # Paints the cell's text as a push button and reports clicks on it, so a table of any size
+    # needs no button widgets of its own
+    clicked = pyqtSignal(QModelIndex)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pressed_cell = None
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(4, 4, -4, -4)
+        button.text = index.data() or ""
+        button.state = QStyle.StateFlag.State_Enabled
+        if self.pressed_cell == (index.row(), index.column()):
+            button.state |= QStyle.StateFlag.State_Sunken
+        else:
+            button.state |= QStyle.StateFlag.State_Raised
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.Type.MouseButtonPress and event.button() == Qt.MouseButton.LeftButton:
+            self.pressed_cell = (index.row(), index.column())
+            return True
+        if event.type() == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.LeftButton:
+            # Like a real button, a press only counts if it is released over the same cell
+            was_pressed = self.pressed_cell == (index.row(), index.column())
+            self.pressed_cell = None
+            if was_pressed and option.rect.contains(event.position().toPoint()):
+                self.clicked.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
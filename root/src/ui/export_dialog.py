@@ -0,0 +1,46 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QFileDialog, QMessageBox, QProgressDialog
+from export_writers import EXPORT_FORMATS, available_formats, format_for_path
+from export_worker import ExportWorker
+
+def start_export(parent, title, headers, total_rows, make_chunks, format_row):
+    # Asks for a file and format, then streams the rows on an ExportWorker behind a cancellable
+    # progress dialog. Returns the running worker, or None if the user cancelled the file dialog.
+    formats = available_formats()
+    filters = [EXPORT_FORMATS[name][0] for name in formats]
+    file_name, selected_filter = QFileDialog.getSaveFileName(parent, title, "", ";;".join(filters))
+    if not file_name:
+        return None
+
+    # A suffix typed by the user wins over the selected filter
+    export_format = formats[filters.index(selected_filter)] if selected_filter in filters else 'csv'
+    typed_format = format_for_path(file_name, default=None)
+    if typed_format in formats:
+        export_format = typed_format
+    else:
+        file_name += EXPORT_FORMATS[export_format][1]
+
+    progress_dialog = QProgressDialog(f"Exporting {total_rows} rows...", "Cancel", 0, max(total_rows, 1), parent)
+    progress_dialog.setWindowTitle(title)
+    progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+    progress_dialog.setMinimumDuration(500)
+    progress_dialog.setAutoClose(False)
+    progress_dialog.setAutoReset(False)
+
+    worker = ExportWorker(make_chunks(), file_name, export_format, headers, format_row, parent)
+    worker.progress.connect(lambda rows: progress_dialog.setValue(min(rows, progress_dialog.maximum())))
+    progress_dialog.canceled.connect(worker.cancel)
+
+    def on_finished(rows, path):
+        progress_dialog.close()
+        QMessageBox.information(parent, "Export Successful", f"Exported {rows} rows to {path}.")
+
+    def on_failed(message):
+        progress_dialog.close()
+        QMessageBox.warning(parent, "Error", f"An error occurred while exporting: {message}")
+
+    worker.export_finished.connect(on_finished)
+    worker.export_failed.connect(on_failed)
+    worker.export_cancelled.connect(progress_dialog.close)
+    worker.start()
+    return worker
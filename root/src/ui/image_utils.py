@@ -0,0 +1,21 @@
+import cv2
+from PyQt6.QtGui import QImage, QPixmap
+
+def fit_size(width, height, max_width, max_height):
+    # Largest size with the image's aspect ratio that fits in max_width x max_height
+    scale = min(max_width / float(width), max_height / float(height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+def bgr_to_pixmap(image, max_width, max_height):
+    # Downsize with OpenCV first, then wrap the BGR buffer directly: no colour conversion and
+    # Qt only ever sees display-sized pixels
+    h, w = image.shape[:2]
+    target_w, target_h = fit_size(w, h, max_width, max_height)
+    if (target_w, target_h) != (w, h):
+        interpolation = cv2.INTER_AREA if target_w < w else cv2.INTER_LINEAR
+        image = cv2.resize(image, (target_w, target_h), interpolation=interpolation)
+    elif not image.flags['C_CONTIGUOUS']:
+        image = image.copy()
+    qt_image = QImage(image.data, target_w, target_h, image.strides[0], QImage.Format.Format_BGR888)
+    # fromImage copies the pixels, so the numpy buffer may be released afterwards
+    return QPixmap.fromImage(qt_image)
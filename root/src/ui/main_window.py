@@ -1,4 +1,5 @@
 import logging
+import threading
 from PyQt6.QtWidgets import QMainWindow, QStackedWidget, QWidget, QVBoxLayout
 from PyQt6.QtGui import QFont
 from typing import Dict, Any
@@ -9,6 +10,8 @@ from .pages.reports_page import ReportsPage
 from .pages.show_all_vehicles_page import ShowAllVehiclesPage
 from .pages.add_page import AddPage
 from .pages.remove_page import RemovePage
+from database_manager import get_database_manager
+from image_store import get_image_store
 
 class MainWindow(QMainWindow):
     def __init__(self, config: Dict[str, Any]):
@@ -17,7 +20,10 @@ class MainWindow(QMainWindow):
         self.config = config
         self.setWindowTitle(self.config.get("app_title", "G-LPR"))
         self.setObjectName("mainWindow")
+        # Shared by every page and background worker; closed after they have shut down
+        self.db_manager = get_database_manager()
         self.setup_ui()
+        self.start_image_garbage_collection()
 
     def setup_ui(self):
         central_widget = QWidget()
@@ -35,28 +41,51 @@ class MainWindow(QMainWindow):
         self.init_pages()
 
     def init_pages(self):
-        try:
-            self.pages = {
-                'main': MainPage(self, "Main Page"),
-                'detect': DetectPage(self, "Detect"),
-                'manage': ManagePage(self, "Manage"),
-                'add': AddPage(self, "Add Vehicle"),
-                'remove': RemovePage(self, "Remove Vehicle"),
-                'show_all': ShowAllVehiclesPage(self, "All Vehicles"),
-                'reports': ReportsPage(self, "Reports")
-            }
-            for page in self.pages.values():
-                self.stacked_widget.addWidget(page)
-        except Exception as e:
-            self.logger.error(f"Error initializing pages: {str(e)}", exc_info=True)
-            raise
+        # Pages are built on first use so the main menu shows without paying for the others
+        self.page_classes = {
+            'main': (MainPage, "Main Page"),
+            'detect': (DetectPage, "Detect"),
+            'manage': (ManagePage, "Manage"),
+            'add': (AddPage, "Add Vehicle"),
+            'remove': (RemovePage, "Remove Vehicle"),
+            'show_all': (ShowAllVehiclesPage, "All Vehicles"),
+            'reports': (ReportsPage, "Reports")
+        }
+        self.pages = {}
+        self.get_page('main')
+
+    def get_page(self, page_name: str):
+        if page_name not in self.pages:
+            page_class, title = self.page_classes[page_name]
+            try:
+                page = page_class(self, title)
+            except Exception as e:
+                self.logger.error(f"Error initializing page {page_name}: {str(e)}", exc_info=True)
+                raise
+            self.pages[page_name] = page
+            self.stacked_widget.addWidget(page)
+        return self.pages[page_name]
 
     def show_page(self, page_name: str):
-        if page_name in self.pages:
-            self.stacked_widget.setCurrentWidget(self.pages[page_name])
+        if page_name in self.page_classes:
+            self.stacked_widget.setCurrentWidget(self.get_page(page_name))
         else:
             self.logger.warning(f"Attempted to show non-existent page: {page_name}")
 
+    def start_image_garbage_collection(self):
+        # Runs once per start, off the GUI thread
+        threading.Thread(target=self.collect_image_garbage, name="ImageGC", daemon=True).start()
+
+    def collect_image_garbage(self):
+        try:
+            min_age_hours = self.config.get('image_store', {}).get('gc_min_age_hours', 24)
+            get_image_store(self.config).collect_garbage(self.db_manager, min_age_hours * 3600)
+        except Exception as e:
+            self.logger.error(f"Error collecting unreferenced images: {str(e)}", exc_info=True)
+
     def closeEvent(self, event):
         self.logger.info("Application closing")
+        for page in self.pages.values():
+            page.shutdown()
+        self.db_manager.close()
         super().closeEvent(event)
\ No newline at end of file
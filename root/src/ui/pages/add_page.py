@@ -1,12 +1,11 @@
 from PyQt6.QtWidgets import (QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
                              QLineEdit, QMessageBox, QComboBox)
 from .base_page import BasePage
-from database_manager import get_database_manager
 
 class AddPage(BasePage):
     def __init__(self, main_window, title):
         super().__init__(main_window, title)
-        self.db_manager = get_database_manager()
+        self.db_manager = main_window.db_manager
 
     def setup_content(self):
         layout = QVBoxLayout()
@@ -62,7 +61,7 @@ class AddPage(BasePage):
                 raise ValueError("All fields are required")
 
             success = self.db_manager.add_vehicle(
-                vehicle_number, vehicle_type, vehicle_color, owner_name, owner_aadhar, affiliation, ""
+                vehicle_number, vehicle_type, vehicle_color, owner_name, owner_aadhar, affiliation, None
             )
 
             if success:
@@ -103,4 +103,8 @@ class BasePage(QWidget):
         pass
 
     def go_back(self):
+        pass
+
+    def shutdown(self):
+        # Called by the main window before the application exits
         pass
\ No newline at end of file
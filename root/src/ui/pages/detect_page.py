@@ -1,29 +1,70 @@
-import cv2
-import os
-from PyQt6.QtWidgets import QLabel, QPushButton, QHBoxLayout, QVBoxLayout, QLineEdit, QWidget, QMessageBox
-from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtWidgets import (QLabel, QPushButton, QHBoxLayout, QVBoxLayout, QGridLayout, QLineEdit, QWidget,
+                             QMessageBox, QProgressBar, QSizePolicy)
 from PyQt6.QtCore import QTimer, Qt
 from .base_page import BasePage
-from ultralytics import YOLO
-from paddleocr import PaddleOCR
+from ..image_utils import bgr_to_pixmap
 from collections import deque
-from database_manager import get_database_manager
+from config import get_camera_configs
+from camera_capture import CameraCapture
+from inference_worker import InferenceWorker
+from evidence_writer import EvidenceWriter
+from image_store import get_image_store
 from datetime import datetime
+import threading
 
 class DetectPage(BasePage):
     def __init__(self, main_window, title):
         super().__init__(main_window, title)
-        self.setup_models()
+        self.db_manager = main_window.db_manager
         self.setup_camera()
-        self.db_manager = get_database_manager()
+        self.setup_inference_worker()
+        self.setup_evidence_writer()
+        # Build the registry's plate index in the background so the first popup does not wait on it
+        threading.Thread(target=self.db_manager.build_plate_index, daemon=True).start()
         self.is_processing = False
         self.is_popup_open = False
+        self.detection_frame = None
+        self.detection_camera_id = None
+        self.detection_plate_img = None
+        self.pending_detections = deque(maxlen=10)
 
     def setup_content(self):
-        # Camera feed
-        self.camera_label = QLabel()
-        self.camera_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.content_layout.addWidget(self.camera_label)
+        self.camera_configs = get_camera_configs(self.config)
+
+        # One tile per camera: name, live feed and inference throughput
+        self.camera_labels = {}
+        self.camera_stats_labels = {}
+        camera_grid = QGridLayout()
+        columns = 1 if len(self.camera_configs) == 1 else 2
+        for i, camera in enumerate(self.camera_configs):
+            tile_layout = QVBoxLayout()
+            name_label = QLabel(camera['name'])
+            name_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            tile_layout.addWidget(name_label)
+
+            camera_label = QLabel()
+            camera_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            # Ignored size policy: the label takes its size from the layout, not from the pixmap it shows
+            camera_label.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
+            camera_label.setMinimumSize(320, 240)
+            tile_layout.addWidget(camera_label)
+            self.camera_labels[camera['id']] = camera_label
+
+            stats_label = QLabel()
+            stats_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            tile_layout.addWidget(stats_label)
+            self.camera_stats_labels[camera['id']] = stats_label
+
+            camera_grid.addLayout(tile_layout, i // columns, i % columns)
+        self.content_layout.addLayout(camera_grid)
+
+        # Model loading progress, hidden once the models are ready
+        self.model_status_label = QLabel("Loading detection models...")
+        self.model_status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.content_layout.addWidget(self.model_status_label)
+        self.model_progress_bar = QProgressBar()
+        self.model_progress_bar.setRange(0, 100)
+        self.content_layout.addWidget(self.model_progress_bar)
 
         # Buttons layout
         button_layout = QHBoxLayout()
@@ -38,113 +79,194 @@ class DetectPage(BasePage):
 
         self.content_layout.addLayout(button_layout)
 
-    def setup_models(self):
-        model_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', self.config['models']['license_plate'])
-        self.license_plate_model = YOLO(model_path)
-        self.ocr = PaddleOCR(use_angle_cls=True, lang='en', use_gpu=True)
+    def setup_inference_worker(self):
+        # A single worker owns the models and schedules frames from every camera; it loads them
+        # in the background so the page is usable (camera preview) while they load
+        self.inference_worker = InferenceWorker(self.config, self.camera_configs)
+        self.inference_worker.loading_progress.connect(self.update_model_progress)
+        self.inference_worker.models_loaded.connect(self.handle_models_loaded)
+        self.inference_worker.detections_ready.connect(self.handle_detections)
+        self.inference_worker.model_load_failed.connect(self.handle_model_load_failed)
+        self.inference_worker.stats_updated.connect(self.update_camera_stats)
+        self.inference_worker.start()
+
+    def setup_evidence_writer(self):
+        # Evidence images are encoded and written on their own thread so a slow disk never stalls the UI
+        evidence_config = self.config.get('evidence', {})
+        self.evidence_writer = EvidenceWriter(
+            get_image_store(self.config),
+            self.db_manager,
+            max_width=evidence_config.get('max_width'),
+            fsync_batch_size=evidence_config.get('fsync_batch_size', 10),
+            fsync_interval=evidence_config.get('fsync_interval_seconds', 2.0)
+        )
+        self.evidence_writer.start()
 
     def setup_camera(self):
-        self.cap = None
-        self.frame_buffer = deque(maxlen=10)
-        self.capture_timer = QTimer(self)
-        self.capture_timer.timeout.connect(self.capture_frame)
+        self.camera_captures = {}
+        self.last_submitted_sequences = {}
+        self.last_displayed = {}
         self.display_timer = QTimer(self)
         self.display_timer.timeout.connect(self.display_frame)
         self.process_timer = QTimer(self)
         self.process_timer.timeout.connect(self.process_frame)
 
     def start_camera(self):
-        if self.cap is None:
-            self.cap = cv2.VideoCapture(self.config['camera']['index'])
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config['camera']['width'])
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config['camera']['height'])
-            self.is_processing = True
-            self.capture_timer.start(30)  # Capture frame every 30 ms
-            self.display_timer.start(30)  # Display frame every 30 ms
-            self.process_timer.start(50)  # Process frame every 50 ms
+        if self.camera_captures:
+            return
+        for camera in self.camera_configs:
+            # Each capture thread reads at its camera's native rate; the timers below only consume
+            camera_capture = CameraCapture(
+                camera['id'], camera['source'], camera['width'], camera['height'], camera.get('buffer_size', 10)
+            )
+            camera_capture.capture_failed.connect(self.handle_capture_failed)
+            camera_capture.start()
+            self.camera_captures[camera['id']] = camera_capture
+            self.inference_worker.reset_tracking(camera['id'])
+        self.is_processing = True
+        self.display_timer.start(30)  # Display frame every 30 ms
+        self.process_timer.start(50)  # Process frame every 50 ms
 
     def stop_camera(self):
         self.is_processing = False
-        self.capture_timer.stop()
         self.display_timer.stop()
         self.process_timer.stop()
-        if self.cap:
-            self.cap.release()
-        self.cap = None
-        self.camera_label.clear()
-        self.frame_buffer.clear()
-
-    def capture_frame(self):
-        if self.cap and self.is_processing:
-            ret, frame = self.cap.read()
-            if ret:
-                self.frame_buffer.append(frame)
+        for camera_id in list(self.camera_captures):
+            self.stop_capture(camera_id)
+        self.pending_detections.clear()
+
+    def stop_capture(self, camera_id):
+        camera_capture = self.camera_captures.pop(camera_id, None)
+        if camera_capture:
+            camera_capture.stop()
+            self.logger.info(f"Camera {camera_id} stopped: {camera_capture.stats()}")
+        self.last_submitted_sequences.pop(camera_id, None)
+        self.last_displayed.pop(camera_id, None)
+        self.camera_labels[camera_id].clear()
+        self.camera_stats_labels[camera_id].clear()
+
+    def handle_capture_failed(self, camera_id, message):
+        # Other lanes keep running when one camera fails
+        self.stop_capture(camera_id)
+        if not self.camera_captures:
+            self.stop_camera()
+        QMessageBox.critical(self, "Error", message)
 
     def display_frame(self):
-        if self.frame_buffer:
-            frame = self.frame_buffer[-1]  # Get the latest frame
-            rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            h, w, ch = rgb_image.shape
-            bytes_per_line = ch * w
-            qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-            pixmap = QPixmap.fromImage(qt_image)
-            self.camera_label.setPixmap(pixmap.scaled(640, 480, Qt.AspectRatioMode.KeepAspectRatio))
+        for camera_id, camera_capture in self.camera_captures.items():
+            frame = camera_capture.buffer.latest('display')
+            if frame is None:
+                continue
+            camera_label = self.camera_labels[camera_id]
+            size = (camera_label.width(), camera_label.height())
+            # Nothing to redraw unless a new frame arrived or the label was resized
+            if self.last_displayed.get(camera_id) == (frame.sequence, size):
+                continue
+            self.last_displayed[camera_id] = (frame.sequence, size)
+            camera_label.setPixmap(bgr_to_pixmap(frame.image, *size))
 
     def process_frame(self):
-        if self.is_processing and not self.is_popup_open and self.frame_buffer:
-            frame = self.frame_buffer[-1]  # Get the latest frame
-            license_plates = self.detect_license_plates(frame)
-            for box, license_plate_img in license_plates:
-                text = self.recognize_license_plate(license_plate_img)
-                if text and self.is_valid_license_plate(text):
-                    self.is_popup_open = True
-                    self.show_popup(text, license_plate_img)
-                    return  # Exit the method after showing the popup
-
-    def detect_license_plates(self, image):
-        results = self.license_plate_model(image)
-        license_plates = []
-        for box in results[0].boxes.xyxy:
-            x1, y1, x2, y2 = map(int, box)
-            license_plate_img = image[y1:y2, x1:x2]
-            license_plates.append((box, license_plate_img))
-        return license_plates
-
-    def recognize_license_plate(self, image):
-        result = self.ocr.ocr(image, cls=True)
-        if result[0]:
-            return ''.join([line[1][0] for line in result[0]])
-        return None
+        if not self.is_processing:
+            return
+        for camera_id, camera_capture in self.camera_captures.items():
+            frame = camera_capture.buffer.latest('inference')
+            if frame is None or frame.sequence == self.last_submitted_sequences.get(camera_id):
+                continue
+            # Hand the latest frame to the scheduler; it drops any frame it has not started on yet
+            self.last_submitted_sequences[camera_id] = frame.sequence
+            self.inference_worker.submit_frame(camera_id, frame)
+
+    def handle_detections(self, camera_id, frame, detections):
+        # Results may arrive after the camera was stopped
+        if not self.is_processing:
+            return
+        for detection in detections:
+            if detection.text and self.is_valid_license_plate(detection.text):
+                # Each tracked vehicle is reported once; hold it until the operator is free
+                self.pending_detections.append((camera_id, frame, detection))
+        self.show_next_detection()
+
+    def show_next_detection(self):
+        if self.is_popup_open or not self.pending_detections:
+            return
+        camera_id, frame, detection = self.pending_detections.popleft()
+        self.is_popup_open = True
+        self.detection_camera_id = camera_id
+        self.detection_frame = frame
+        self.detection_plate_img = detection.license_plate_img
+        self.show_popup(detection.text, detection.license_plate_img, self.camera_name(camera_id))
+
+    def camera_name(self, camera_id):
+        for camera in self.camera_configs:
+            if camera['id'] == camera_id:
+                return camera['name']
+        return camera_id
+
+    def update_camera_stats(self, stats):
+        for camera_id, camera_stats in stats.items():
+            if camera_id in self.camera_captures:
+                capture_stats = self.camera_captures[camera_id].stats()
+                self.camera_stats_labels[camera_id].setText(
+                    f"Inference {camera_stats['fps']} fps | Plates {camera_stats['reported']} | "
+                    f"No motion {camera_stats['skipped']} | "
+                    f"Captured {capture_stats['captured']} | Read failures {capture_stats['read_failures']}"
+                )
+
+    def update_model_progress(self, percent, message):
+        self.model_progress_bar.setValue(percent)
+        self.model_status_label.setText(message)
+
+    def handle_models_loaded(self):
+        self.model_progress_bar.hide()
+        self.model_status_label.hide()
+
+    def handle_model_load_failed(self, message):
+        self.model_progress_bar.hide()
+        self.model_status_label.setText("Detection models failed to load")
+        self.stop_camera()
+        QMessageBox.critical(self, "Error", f"Failed to load detection models: {message}")
 
     def is_valid_license_plate(self, text):
         # Implement your license plate validation logic here
         return bool(text)
 
-    def show_popup(self, recognized_text, license_plate_img):
-        popup = RecognitionPopup(recognized_text, license_plate_img, self)
+    def show_popup(self, recognized_text, license_plate_img, camera_name=None):
+        popup = RecognitionPopup(
+            recognized_text, license_plate_img, self, camera_name, self.suggest_plate(recognized_text)
+        )
         popup.show()
 
+    def suggest_plate(self, recognized_text):
+        # The closest registered plate when the reading is near one but not exactly it, so a
+        # slightly misread plate is not saved as a new "Unknown" vehicle. No suggestion while the
+        # index is still being built.
+        plate_index = self.db_manager.get_plate_index()
+        match = plate_index.closest(recognized_text) if plate_index is not None else None
+        if match is None or match[0] == recognized_text:
+            return None
+        return match[0]
+
     def save_to_database(self, recognized_text, corrected_text):
-        # Save the license plate image
-        image_path = os.path.join(self.config['license_plates_dir'], f"{corrected_text}.jpg")
-        os.makedirs(os.path.dirname(image_path), exist_ok=True)
-        cv2.imwrite(image_path, cv2.cvtColor(self.frame_buffer[-1], cv2.COLOR_BGR2RGB))
+        # Queue the full frame and plate crop; they are hashed and written on the evidence thread,
+        # and the frame path is attached to the log entry once both are done
+        stored = self.evidence_writer.submit(self.detection_frame.image, self.detection_plate_img)
 
         # Check if the vehicle exists in the database
         vehicle = self.db_manager.get_vehicle(corrected_text)
         if not vehicle:
-            # Add new vehicle to the database
+            # Add new vehicle to the database; its photo is the gate frame, attached below
             self.db_manager.add_vehicle(
-                corrected_text, "Unknown", "Unknown", "Unknown", "Unknown", "Unknown", image_path
+                corrected_text, "Unknown", "Unknown", "Unknown", "Unknown", "Unknown", None, wait=False
             )
 
-        # Log entry/exit
-        self.db_manager.log_entry_exit(corrected_text)
+        # Log entry/exit; queued writes are committed in order, so this lands after the add above
+        logged = self.db_manager.log_entry_exit(corrected_text, wait=False)
+        self.db_manager.attach_evidence(logged, stored, None if vehicle else corrected_text)
 
     def go_to_add_vehicle(self, plate_number):
         self.main_window.show_page('add')
         # Populate the vehicle number field in the add page
-        add_page = self.main_window.pages['add']
+        add_page = self.main_window.get_page('add')
         add_page.vehicle_number_input.setText(plate_number)
 
     def show_vehicle_details(self, plate_number):
@@ -162,18 +284,24 @@ class DetectPage(BasePage):
 
     def resume_processing(self):
         self.is_popup_open = False
+        self.show_next_detection()
 
     def go_back(self):
         self.stop_camera()
         self.main_window.show_page('main')
 
+    def shutdown(self):
+        self.stop_camera()
+        self.inference_worker.stop()
+        self.evidence_writer.close()
+
     def closeEvent(self, event):
         self.stop_camera()
         super().closeEvent(event)
 
 
 class RecognitionPopup(QWidget):
-    def __init__(self, recognized_text, license_plate_img, parent=None):
+    def __init__(self, recognized_text, license_plate_img, parent=None, camera_name=None, suggested_plate=None):
         super().__init__(parent)
         self.parent = parent
         self.setWindowTitle("License Plate Recognized")
@@ -183,6 +311,9 @@ class RecognitionPopup(QWidget):
 
         layout = QVBoxLayout()
 
+        if camera_name:
+            layout.addWidget(QLabel(camera_name))
+
         # Display the license plate image
         self.frame_label = QLabel()
         self.display_license_plate(license_plate_img)
@@ -191,6 +322,15 @@ class RecognitionPopup(QWidget):
         self.text_input = QLineEdit(recognized_text)
         layout.addWidget(self.text_input)
 
+        # Offer the closest registered plate; the operator decides whether the reading was wrong
+        if suggested_plate:
+            suggestion_layout = QHBoxLayout()
+            suggestion_layout.addWidget(QLabel(f"Registered plate: {suggested_plate}"))
+            use_suggestion_button = QPushButton("Use Registered Plate")
+            use_suggestion_button.clicked.connect(lambda: self.text_input.setText(suggested_plate))
+            suggestion_layout.addWidget(use_suggestion_button)
+            layout.addLayout(suggestion_layout)
+
         # First row of buttons
         button_layout1 = QHBoxLayout()
         
@@ -222,18 +362,12 @@ class RecognitionPopup(QWidget):
         self.recognized_text = recognized_text  # Save the recognized text
 
     def display_license_plate(self, license_plate_img):
-        rgb_image = cv2.cvtColor(license_plate_img, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image)
-        self.frame_label.setPixmap(pixmap.scaled(380, 200, Qt.AspectRatioMode.KeepAspectRatio))
+        self.frame_label.setPixmap(bgr_to_pixmap(license_plate_img, 380, 200))
 
     def save_text(self):
         corrected_text = self.text_input.text()
         self.parent.save_to_database(self.recognized_text, corrected_text)
-        self.parent.resume_processing()  # Resume processing before closing
-        self.close()  # Close the popup
+        self.close()  # Close the popup; closeEvent resumes processing
 
     def save_and_add_to_database(self):
         corrected_text = self.text_input.text()
@@ -1,12 +1,11 @@
 from PyQt6.QtWidgets import (QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
                              QLineEdit, QMessageBox)
 from .base_page import BasePage
-from database_manager import get_database_manager
 
 class RemovePage(BasePage):
     def __init__(self, main_window, title):
         super().__init__(main_window, title)
-        self.db_manager = get_database_manager()
+        self.db_manager = main_window.db_manager
 
     def setup_content(self):
         layout = QVBoxLayout()
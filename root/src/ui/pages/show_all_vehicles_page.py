@@ -1,23 +1,20 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
-                             QLineEdit, QTableWidget, QTableWidgetItem, QHeaderView, QDialog, QFormLayout,
-                             QMessageBox, QFileDialog)
-from PyQt6.QtCore import Qt, QTimer
+                             QLineEdit, QTableView, QHeaderView, QDialog, QFormLayout,
+                             QMessageBox)
+from PyQt6.QtCore import Qt, QTimer, QSize
 from PyQt6.QtGui import QFont, QIcon
 from .base_page import BasePage
-from database_manager import get_database_manager
-from fuzzywuzzy import fuzz
-import csv
+from ..table_models import VehicleTableModel
+from ..button_delegate import ButtonDelegate
+from ..export_dialog import start_export
 
 class ShowAllVehiclesPage(BasePage):
     def __init__(self, main_window, title):
-        self.db_manager = get_database_manager()
+        self.db_manager = main_window.db_manager
         self.search_timer = QTimer()
         self.search_timer.setSingleShot(True)
         self.search_timer.timeout.connect(self.perform_search)
-        self.current_page = 1
-        self.items_per_page = 20  # Initialize items_per_page here
-        self.total_items = 0
-        self.current_vehicles = []
+        self.export_worker = None
         super().__init__(main_window, title)
 
     def setup_content(self):
@@ -35,43 +32,27 @@ class ShowAllVehiclesPage(BasePage):
 
         self.content_layout.addLayout(search_layout)
 
-        # Table for displaying vehicles
-        self.vehicles_table = QTableWidget()
-        self.vehicles_table.setColumnCount(8)
-        self.vehicles_table.setHorizontalHeaderLabels(["Vehicle Number", "Type", "Color", "Owner Name", "Owner Aadhar", "Affiliation", "Edit", "Delete"])
+        # Table for displaying vehicles; rows are read from the database as it scrolls
+        self.vehicles_model = VehicleTableModel(self.db_manager, parent=self)
+        self.vehicles_table = QTableView()
+        self.vehicles_table.setModel(self.vehicles_model)
+        self.vehicles_table.setIconSize(QSize(80, 45))  # Thumbnails are pre-scaled by the image store
         self.vehicles_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.vehicles_table.verticalHeader().setDefaultSectionSize(50)  # Set default row height
-        self.vehicles_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)  # Disable direct editing
-        self.content_layout.addWidget(self.vehicles_table)
-
-        # Pagination controls
-        pagination_layout = QHBoxLayout()
-        
-        # Page label (left-aligned)
-        self.page_label = QLabel()
-        pagination_layout.addWidget(self.page_label)
-        
-        # Spacer to push buttons to the right
-        pagination_layout.addStretch()
-        
-        # Previous and Next buttons (right-aligned)
-        self.prev_button = QPushButton("←")
-        self.prev_button.setFixedSize(40, 30)
-        self.prev_button.clicked.connect(self.previous_page)
-        pagination_layout.addWidget(self.prev_button)
-
-        self.next_button = QPushButton("→")
-        self.next_button.setFixedSize(40, 30)
-        self.next_button.clicked.connect(self.next_page)
-        pagination_layout.addWidget(self.next_button)
+        self.vehicles_table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)  # Disable direct editing
 
-        self.content_layout.addLayout(pagination_layout)
+        # Edit and Delete are painted by a delegate rather than built as widgets for every row
+        self.button_delegate = ButtonDelegate(self.vehicles_table)
+        self.button_delegate.clicked.connect(self.on_button_clicked)
+        self.vehicles_table.setItemDelegateForColumn(VehicleTableModel.EDIT_COLUMN, self.button_delegate)
+        self.vehicles_table.setItemDelegateForColumn(VehicleTableModel.DELETE_COLUMN, self.button_delegate)
+        self.content_layout.addWidget(self.vehicles_table)
 
-        # Export to CSV button (bottom right corner)
+        # Export button (bottom right corner)
         export_layout = QHBoxLayout()
         export_layout.addStretch()
-        export_button = QPushButton("Export to CSV")
-        export_button.clicked.connect(self.export_to_csv)
+        export_button = QPushButton("Export")
+        export_button.clicked.connect(self.export_vehicles)
         export_layout.addWidget(export_button)
         self.content_layout.addLayout(export_layout)
 
@@ -79,44 +60,8 @@ class ShowAllVehiclesPage(BasePage):
         self.load_vehicles()
 
     def load_vehicles(self, search_term=None):
-        self.current_vehicles = self.db_manager.get_all_vehicles()
-        self.total_items = len(self.current_vehicles)
-        self.current_page = 1
-        self.update_table(search_term)
-        self.update_pagination_controls()
-
-    def update_table(self, search_term=None):
-        start_index = (self.current_page - 1) * self.items_per_page
-        end_index = min(start_index + self.items_per_page, self.total_items)
-        page_vehicles = self.current_vehicles[start_index:end_index]
-
-        self.vehicles_table.setRowCount(0)
-        for row, vehicle in enumerate(page_vehicles):
-            if search_term:
-                match_score = max(
-                    fuzz.partial_ratio(search_term.lower(), str(field).lower())
-                    for field in vehicle
-                )
-                if match_score < 70:  # Adjust threshold as needed
-                    continue
-
-            self.vehicles_table.insertRow(row)
-            self.vehicles_table.setRowHeight(row, 50)  # Set row height to 50 pixels
-
-            for col, value in enumerate(vehicle[:6]):  # Exclude image_path
-                item = QTableWidgetItem(str(value))
-                item.setTextAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignHCenter)
-                self.vehicles_table.setItem(row, col, item)
-
-            # Edit button
-            edit_button = QPushButton("Edit")
-            edit_button.clicked.connect(lambda checked, r=row: self.edit_vehicle(r))
-            self.vehicles_table.setCellWidget(row, 6, edit_button)
-
-            # Delete button
-            delete_button = QPushButton("Delete")
-            delete_button.clicked.connect(lambda checked, r=row: self.delete_vehicle(r))
-            self.vehicles_table.setCellWidget(row, 7, delete_button)
+        # Searches run against the database's plate-aware index rather than scoring every row here
+        self.vehicles_model.set_search(search_term.strip() if search_term else None)
 
     def on_search_text_changed(self):
         self.search_timer.start(300)  # Debounce for 300ms
@@ -129,8 +74,14 @@ class ShowAllVehiclesPage(BasePage):
         self.search_input.clear()
         self.load_vehicles()
 
+    def on_button_clicked(self, index):
+        if index.column() == VehicleTableModel.EDIT_COLUMN:
+            self.edit_vehicle(index.row())
+        elif index.column() == VehicleTableModel.DELETE_COLUMN:
+            self.delete_vehicle(index.row())
+
     def edit_vehicle(self, row):
-        vehicle_number = self.vehicles_table.item(row, 0).text()
+        vehicle_number = self.vehicles_model.row_at(row)[0]
         vehicle_data = self.db_manager.get_vehicle(vehicle_number)
         
         if vehicle_data:
@@ -138,7 +89,7 @@ class ShowAllVehiclesPage(BasePage):
             if dialog.exec() == QDialog.DialogCode.Accepted:
                 updated_data = dialog.get_updated_data()
                 if self.db_manager.edit_vehicle(vehicle_number, *updated_data):
-                    self.load_vehicles()  # Reload the table to reflect changes
+                    self.vehicles_model.reload()  # Reload the table to reflect changes
                     QMessageBox.information(self, "Success", f"Vehicle {vehicle_number} updated successfully")
                 else:
                     QMessageBox.warning(self, "Error", f"Failed to update vehicle {vehicle_number}")
@@ -146,47 +97,33 @@ class ShowAllVehiclesPage(BasePage):
             QMessageBox.warning(self, "Error", f"Vehicle {vehicle_number} not found")
             
     def delete_vehicle(self, row):
-        vehicle_number = self.vehicles_table.item(row, 0).text()
+        vehicle_number = self.vehicles_model.row_at(row)[0]
         confirm = QMessageBox.question(self, "Confirm Deletion", f"Are you sure you want to delete vehicle {vehicle_number}?",
                                        QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if confirm == QMessageBox.StandardButton.Yes:
             if self.db_manager.delete_vehicle(vehicle_number):
-                self.load_vehicles()  # Reload the table to reflect changes
+                self.vehicles_model.reload()  # Reload the table to reflect changes
                 QMessageBox.information(self, "Success", f"Vehicle {vehicle_number} deleted successfully")
             else:
                 QMessageBox.warning(self, "Error", f"Failed to delete vehicle {vehicle_number}")
 
-    def update_pagination_controls(self):
-        total_pages = (self.total_items + self.items_per_page - 1) // self.items_per_page
-        self.page_label.setText(f"Page {self.current_page} of {total_pages}")
-        self.prev_button.setEnabled(self.current_page > 1)
-        self.next_button.setEnabled(self.current_page < total_pages)
-
-    def previous_page(self):
-        if self.current_page > 1:
-            self.current_page -= 1
-            self.update_table()
-            self.update_pagination_controls()
-
-    def next_page(self):
-        total_pages = (self.total_items + self.items_per_page - 1) // self.items_per_page
-        if self.current_page < total_pages:
-            self.current_page += 1
-            self.update_table()
-            self.update_pagination_controls()
-
-    def export_to_csv(self):
-        try:
-            file_name, _ = QFileDialog.getSaveFileName(self, "Save CSV", "", "CSV Files (*.csv)")
-            if file_name:
-                with open(file_name, 'w', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(["Vehicle Number", "Type", "Color", "Owner Name", "Owner Aadhar", "Affiliation"])
-                    for vehicle in self.current_vehicles:
-                        writer.writerow(vehicle[:6])  # Exclude image_path
-                QMessageBox.information(self, "Export Successful", "The vehicle data has been exported to CSV successfully.")
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"An error occurred while exporting to CSV: {str(e)}")
+    def export_vehicles(self):
+        if self.export_worker is not None and self.export_worker.isRunning():
+            QMessageBox.warning(self, "Error", "An export is already running")
+            return
+        self.export_worker = start_export(
+            self,
+            "Export Vehicles",
+            ["Vehicle Number", "Type", "Color", "Owner Name", "Owner Aadhar", "Affiliation"],
+            self.db_manager.count_vehicles(),
+            self.db_manager.iter_vehicles,
+            lambda vehicle: list(vehicle[:6])  # Exclude image_path
+        ) or self.export_worker
+
+    def shutdown(self):
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+            self.export_worker.wait()
 
     def go_back(self):
         self.main_window.show_page('manage')
@@ -0,0 +1,151 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QPixmap, QPixmapCache
+from timestamps import format_timestamp, format_duration
+
+class LazyTableModel(QAbstractTableModel):
+    # Rows are read from the database one page at a time as the view scrolls towards the end, so
+    # only what has been looked at is ever loaded or formatted. Subclasses provide fetch_page(),
+    # next_key() and display_row().
+    HEADERS = []
+
+    def __init__(self, db_manager, batch_size=100, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.rows = []
+        self.display_rows = []
+        self.exhausted = True
+
+    def reload(self):
+        self.beginResetModel()
+        self.rows = []
+        self.display_rows = []
+        self.exhausted = not self.is_active()
+        self.endResetModel()
+
+    def is_active(self):
+        return True
+
+    def row_at(self, row):
+        return self.rows[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        after = self.next_key(self.rows[-1]) if self.rows else None
+        rows, self.exhausted = self.fetch_page(after)
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+            self.rows.extend(rows)
+            self.display_rows.extend(self.display_row(row) for row in rows)
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.display_rows[index.row()][index.column()]
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignHCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+class EntryExitTableModel(LazyTableModel):
+    HEADERS = ["Vehicle Number", "Entry Time", "Exit Time", "Duration"]
+    # Table column -> entry_exit column it sorts by
+    SORT_COLUMNS = ['vehicle_number', 'in_time', 'out_time', 'duration_ms']
+
+    def __init__(self, db_manager, batch_size=100, parent=None):
+        super().__init__(db_manager, batch_size, parent)
+        # (vehicle_number, start_ms, end_ms); None until the first search, None dates mean no date filter
+        self.filters = None
+        self.sort_column = 'in_time'
+        self.descending = True
+
+    def set_filters(self, vehicle_number, start_date, end_date):
+        self.filters = (vehicle_number, start_date, end_date)
+        self.reload()
+
+    def is_active(self):
+        return self.filters is not None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # Sorted by the database across all results, then read again from the top
+        self.sort_column = self.SORT_COLUMNS[column]
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self.reload()
+
+    def fetch_page(self, after):
+        rows = self.db_manager.get_entry_exit_page(
+            *self.filters,
+            sort_column=self.sort_column,
+            descending=self.descending,
+            after=after,
+            limit=self.batch_size
+        )
+        return rows, len(rows) < self.batch_size
+
+    def next_key(self, row):
+        return self.db_manager.entry_exit_page_key(row, self.sort_column)
+
+    def display_row(self, log):
+        return (log[1], format_timestamp(log[2]), format_timestamp(log[3]), format_duration(log[6]))
+
+class VehicleTableModel(LazyTableModel):
+    HEADERS = ["Vehicle Number", "Type", "Color", "Owner Name", "Owner Aadhar", "Affiliation", "Photo", "Edit", "Delete"]
+    PHOTO_COLUMN = 6
+    EDIT_COLUMN = 7
+    DELETE_COLUMN = 8
+
+    def __init__(self, db_manager, batch_size=100, parent=None):
+        super().__init__(db_manager, batch_size, parent)
+        # While set, the model holds the ranked matches from DatabaseManager.search_vehicles()
+        # instead of paging through every vehicle
+        self.search_term = None
+
+    def set_search(self, search_term):
+        self.search_term = search_term or None
+        self.reload()
+
+    def fetch_page(self, after):
+        if self.search_term is not None:
+            # Search results are already limited and ranked, so they arrive as a single page
+            return self.db_manager.search_vehicles(self.search_term), True
+        rows = self.db_manager.get_vehicles_page(after, self.batch_size)
+        return rows, len(rows) < self.batch_size
+
+    def next_key(self, row):
+        return row[0]
+
+    def display_row(self, vehicle):
+        # image_path and thumbnail_path are not shown as text
+        return tuple(str(value) for value in vehicle[:6]) + (None, "Edit", "Delete")
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if index.isValid() and index.column() == self.PHOTO_COLUMN and role == Qt.ItemDataRole.DecorationRole:
+            return self.thumbnail(self.rows[index.row()][7])
+        return super().data(index, role)
+
+    @staticmethod
+    def thumbnail(thumbnail_path):
+        # Photo preview from the stored thumbnail, never the full-size image; decoded once and cached
+        if not thumbnail_path:
+            return None
+        pixmap = QPixmapCache.find(thumbnail_path)
+        if pixmap is None:
+            pixmap = QPixmap(thumbnail_path)
+            QPixmapCache.insert(thumbnail_path, pixmap)
+        return pixmap
@@ -0,0 +1,91 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+class WriteQueue(threading.Thread):
+    # Applies queued write operations on one thread, grouping whatever arrives within a short window
+    # into a single transaction so a burst of gate events costs one commit instead of one each.
+    # Every operation runs in its own savepoint: a failing one is rolled back without its batch.
+
+    def __init__(self, db_manager, max_batch_size=64, batch_interval=0.05):
+        super().__init__(name="DatabaseWriteQueue", daemon=True)
+        self.logger = logging.getLogger(__name__)
+        self.db_manager = db_manager
+        self.max_batch_size = max_batch_size
+        self.batch_interval = batch_interval
+        self.queue = queue.Queue()
+        self.closed = False
+        self.close_lock = threading.Lock()
+        self.batches_committed = 0
+        self.writes_committed = 0
+
+    def submit(self, operation):
+        # operation(cursor) runs on the queue thread; the returned Future resolves after the commit
+        future = Future()
+        with self.close_lock:
+            if self.closed:
+                future.set_exception(sqlite3.ProgrammingError("Write queue is closed"))
+            else:
+                self.queue.put((operation, future))
+        return future
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            job = self.queue.get()
+            if job is None:
+                break
+            batch = [job]
+            deadline = time.monotonic() + self.batch_interval
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            self.commit(batch)
+
+    def commit(self, batch):
+        outcomes = []
+        try:
+            with self.db_manager.writing() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                for operation, future in batch:
+                    cursor.execute("SAVEPOINT write_job")
+                    try:
+                        outcomes.append((future, operation(cursor), None))
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO write_job")
+                        outcomes.append((future, None, e))
+                    cursor.execute("RELEASE write_job")
+        except Exception as e:
+            self.logger.error(f"Error committing {len(batch)} queued writes: {str(e)}", exc_info=True)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches_committed += 1
+        self.writes_committed += len(batch)
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def close(self):
+        # Everything submitted before close() is committed before it returns
+        with self.close_lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.queue.put(None)
+        self.join()
+        self.logger.info(f"Write queue closed: {self.writes_committed} writes in {self.batches_committed} transactions")